@@ -0,0 +1,524 @@
+#! /usr/bin/env python3
+
+"""Offline benchmark of kink-radio.
+
+    A local HTTP server stands in for api.kink.nl and the stream servers: it
+    replays now-playing.json snapshots (recorded or generated), and serves
+    album art, .pls files and a silent MP3 stream, with optional latency and
+    errors. KinkRadio runs against it with a stubbed tray icon and stubbed
+    notifications. Every track change stands for one song of simulated play.
+
+    Reported: requests per track change, notification latency from the
+    moment a track is published, menu update time and memory use.
+
+    Usage:
+        python3 bench/kink_bench.py --tracks 200 --track-seconds 3
+        python3 bench/kink_bench.py --replay recorded.jsonl --latency 200 --error-rate 0.05
+        python3 bench/kink_bench.py record recorded.jsonl --count 50
+    Without a display run it with xvfb-run.
+"""
+
+import os
+import sys
+import json
+import tempfile
+import argparse
+from random import random, uniform
+from threading import Lock, Thread
+from time import monotonic, sleep, time
+from urllib.request import urlopen
+from configparser import ConfigParser
+from os.path import abspath, dirname, join
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+APP_DIR = join(dirname(dirname(abspath(__file__))), 'usr', 'lib', 'kink-radio')
+STATIONS = ('kink', 'kink-dna', 'kink-distortion', 'kink-indie')
+STREAM_KEYS = {'stream_kink': 'kink',
+               'stream_dna': 'kink-dna',
+               'stream_indie': 'kink-indie',
+               'stream_distortion': 'kink-distortion'}
+# Silent MPEG-1 Layer III frame: 128 kbit/s, 44.1 kHz, 26 ms
+MP3_FRAME = bytes([0xFF, 0xFB, 0x90, 0x64]) + bytes(413)
+MP3_FRAME_SECONDS = 1152 / 44100
+# Small image served as album art
+ART = bytes([0xFF, 0xD8, 0xFF, 0xE0]) + bytes(4092) + bytes([0xFF, 0xD9])
+
+
+def percentile(values, part):
+    """Get a percentile of a list of numbers.
+
+    Args:
+        values (list): numbers
+        part (float): percentile between 0 and 1
+
+    Returns:
+        float: value or 0 when the list is empty
+    """
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(int(part * len(values)), len(values) - 1)]
+
+
+def rss_mb():
+    """Get the resident memory of this process.
+
+    Returns:
+        float: resident memory in MB
+    """
+    try:
+        with open('/proc/self/status', encoding='utf-8') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0
+
+
+class FeedReplay():
+    """ now-playing.json snapshots published one after another. """
+    def __init__(self, base_url, tracks, track_seconds, snapshots=None):
+        self.base_url = base_url
+        self.track_seconds = track_seconds
+        self.snapshots = snapshots
+        self.tracks = len(snapshots) if snapshots else tracks
+        self.start = None
+
+    def begin(self):
+        """ Publish the first snapshot. """
+        self.start = time()
+
+    def index(self):
+        """Get the index of the published snapshot.
+
+        Returns:
+            int: snapshot index
+        """
+        if self.start is None:
+            return 0
+        return min(int((time() - self.start) / self.track_seconds), self.tracks - 1)
+
+    def published(self, index):
+        """Get the time a snapshot was published.
+
+        Args:
+            index (int): snapshot index
+
+        Returns:
+            float: POSIX timestamp
+        """
+        return (self.start or time()) + index * self.track_seconds
+
+    def snapshot(self, index):
+        """Get a now-playing.json snapshot.
+
+        Args:
+            index (int): snapshot index
+
+        Returns:
+            dict: now playing data
+        """
+        if self.snapshots:
+            return self.snapshots[index]
+        obj = {'stations': {station: {} for station in STATIONS}, 'extended': {}}
+        for nr, station in enumerate(STATIONS):
+            # Other stations change halfway the selected station's tracks
+            offset = 0 if nr == 0 else 0.5
+            obj['extended'][station] = {
+                'artist': f"Artist {(index + nr) % 37}",
+                'title': f"Title {index} {station}",
+                'album_art': {'320': f"{self.base_url}/art/{(index + nr) % 50}.jpg"},
+                'program': {'title': 'Benchmark'},
+                'started_at': int(self.published(index) - offset * self.track_seconds),
+                'duration': self.track_seconds}
+        return obj
+
+    def title(self, index, station):
+        """Get the title of a station's track in a snapshot.
+
+        Args:
+            index (int): snapshot index
+            station (str): KINK station
+
+        Returns:
+            str: title
+        """
+        data = self.snapshot(index).get('extended', {}).get(station, {})
+        return str(data.get('title', '')) if isinstance(data, dict) else ''
+
+
+class StandIn(ThreadingHTTPServer):
+    """ Local stand-in for the KINK API and stream servers. """
+    daemon_threads = True
+
+    def __init__(self, replay, latency=0, error_rate=0):
+        super().__init__(('127.0.0.1', 0), StandInHandler)
+        self.replay = replay
+        self.latency = latency
+        self.error_rate = error_rate
+        self.counts = {}
+        self.lock = Lock()
+
+    @property
+    def base_url(self):
+        """ Url of the server. """
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count(self, kind):
+        """ Count a request or response of a kind. """
+        with self.lock:
+            self.counts[kind] = self.counts.get(kind, 0) + 1
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """ Answer now-playing, album art, playlist and stream requests. """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        """ Serve a request with the configured latency and errors. """
+        server = self.server
+        path = self.path.split('?')[0]
+        kind = path.strip('/').split('/')[0] or 'root'
+        server.count(kind)
+        if server.latency:
+            sleep(uniform(0.5, 1.5) * server.latency)
+        if kind != 'stream' and random() < server.error_rate:
+            server.count('injected_errors')
+            self._send(503, b'')
+            return
+
+        if path == '/now-playing.json':
+            self._now_playing()
+        elif kind == 'art':
+            self._send(200, ART, 'image/jpeg')
+        elif kind == 'pls':
+            station = path.rsplit('/', 1)[-1].replace('.pls', '')
+            body = (f"[playlist]\nNumberOfEntries=1\n"
+                    f"File1={server.base_url}/stream/{station}\n").encode('utf-8')
+            self._send(200, body, 'audio/x-scpls')
+        elif kind == 'stream':
+            self._stream()
+        else:
+            self._send(404, b'')
+
+    def _now_playing(self):
+        """ Send the published snapshot, or 304 when the client has it. """
+        index = self.server.replay.index()
+        etag = f'"{index}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.server.count('not_modified')
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = json.dumps(self.server.replay.snapshot(index)).encode('utf-8')
+        self._send(200, body, 'application/json', {'ETag': etag,
+                                                   'Cache-Control': 'max-age=5'})
+
+    def _stream(self):
+        """ Send silent MP3 frames in real time until the client disconnects. """
+        self.send_response(200)
+        self.send_header('Content-Type', 'audio/mpeg')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        try:
+            while True:
+                self.wfile.write(MP3_FRAME * 10)
+                sleep(MP3_FRAME_SECONDS * 10)
+        except OSError:
+            pass
+
+    def _send(self, status, body, content_type='text/plain', headers=None):
+        """ Send a complete response. """
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """ Do not log every request. """
+
+
+class Stub():
+    """ Object that accepts every call, for the tray icon. """
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        return Stub()
+
+    def __call__(self, *args, **kwargs):
+        return Stub()
+
+
+class StubNotification(Stub):
+    """ Notification that records when it is shown. """
+    shown = []
+
+    def __init__(self, summary='', body=None, icon=None):
+        super().__init__()
+        self.summary = summary
+        self.body = body
+
+    @classmethod
+    def new(cls, summary='', body=None, icon=None):
+        """ Create a notification. """
+        return cls(summary, body, icon)
+
+    def update(self, summary='', body=None, icon=None):
+        """ Change the text of a shown notification. """
+        self.summary = summary
+        self.body = body
+        return True
+
+    def show(self):
+        """ Record the notification. """
+        StubNotification.shown.append((time(), self.summary, self.body or ''))
+        return True
+
+
+class StubNotify(Stub):
+    """ Notify without a notification daemon. """
+    Notification = StubNotification
+
+
+def write_settings(home, base_url, args):
+    """Write the settings of the benchmark's KinkRadio.
+
+    Args:
+        home (str): temporary home directory
+        base_url (str): url of the stand-in server
+        args (argparse.Namespace): benchmark arguments
+    """
+    conf_parser = ConfigParser(comment_prefixes='/', allow_no_value=True)
+    conf_parser.read(join(APP_DIR, 'settings.ini'))
+    values = {'site': base_url,
+              'json': f"{base_url}/now-playing.json",
+              'station': 'kink',
+              'wait': str(args.wait),
+              'autoplay': str(args.play).lower(),
+              'autostart': 'false',
+              'watch_all': str(args.watch_all).lower(),
+              'mpris': 'false',
+              'metrics': 'true',
+              'metrics_port': '0',
+              'metrics_interval': '0'}
+    for key, station in STREAM_KEYS.items():
+        values[key] = f"{base_url}/pls/{station}.pls"
+    for key, value in values.items():
+        conf_parser.set('kink', key, value)
+    local = join(home, '.kink-radio')
+    os.makedirs(local, exist_ok=True)
+    with open(join(local, 'settings.ini'), mode='w', encoding='utf-8') as settings_ini:
+        conf_parser.write(settings_ini)
+
+
+def notify_latencies(replay, station, shown):
+    """Match notifications to the publication of their track.
+
+    Args:
+        replay (FeedReplay): published snapshots
+        station (str): selected station
+        shown (list): notification time, summary and body
+
+    Returns:
+        list: seconds between publication and first notification of each track
+    """
+    published = {}
+    for index in range(replay.tracks):
+        title = replay.title(index, station)
+        if title and title not in published:
+            published[title] = replay.published(index)
+    latencies = []
+    for title, when in published.items():
+        for shown_at, _summary, body in shown:
+            if title in body:
+                latencies.append(max(shown_at - when, 0))
+                break
+    return latencies
+
+
+def run(args):
+    """Run KinkRadio against the stand-in server and report.
+
+    Args:
+        args (argparse.Namespace): benchmark arguments
+
+    Returns:
+        str: report
+    """
+    snapshots = None
+    if args.replay:
+        with open(args.replay, encoding='utf-8') as replay_file:
+            snapshots = [json.loads(line) for line in replay_file if line.strip()]
+
+    replay = FeedReplay(base_url='', tracks=args.tracks,
+                        track_seconds=args.track_seconds, snapshots=snapshots)
+    server = StandIn(replay, latency=args.latency / 1000, error_rate=args.error_rate)
+    replay.base_url = server.base_url
+    Thread(target=server.serve_forever, daemon=True).start()
+
+    # Keep ~/.kink-radio of the user out of the benchmark
+    home = tempfile.mkdtemp(prefix='kink-bench-')
+    os.environ['HOME'] = home
+    write_settings(home, server.base_url, args)
+
+    sys.path.insert(0, APP_DIR)
+    # pylint: disable=import-outside-toplevel
+    from gi.repository import GLib
+    import tray
+    import notifier
+    import kink
+    tray.AppIndicator3 = Stub()
+    tray.Notify = StubNotify()
+    notifier.Notify = StubNotify()
+
+    start = monotonic()
+    rss_start = rss_mb()
+    radio = kink.KinkRadio()
+    startup = monotonic() - start
+
+    # Time every menu update
+    menu_times = []
+    tray_update = radio.tray.menu.update
+
+    def timed_update():
+        update_start = monotonic()
+        tray_update()
+        menu_times.append(monotonic() - update_start)
+    radio.tray.menu.update = timed_update
+
+    memory = [rss_mb()]
+
+    def sample():
+        memory.append(rss_mb())
+        return True
+    GLib.timeout_add_seconds(1, sample)
+
+    if args.switch_every:
+        stations = list(STATIONS)
+
+        def switch():
+            cur = stations.index(radio.key_value('station')) \
+                if radio.key_value('station') in stations else 0
+            radio.switch_station('station', stations[(cur + 1) % len(stations)])
+            return True
+        GLib.timeout_add(int(args.switch_every * args.track_seconds * 1000), switch)
+
+    replay.begin()
+    duration = replay.tracks * args.track_seconds + 2 * args.wait
+    GLib.timeout_add(int(duration * 1000), radio.quit)
+    radio.run()
+    server.shutdown()
+
+    changes = radio.metrics.counters.get('track_changes_total', 0)
+    counts = dict(server.counts)
+    requests = sum(value for key, value in counts.items()
+                   if key not in ('not_modified', 'injected_errors'))
+    latencies = notify_latencies(replay, 'kink', StubNotification.shown) \
+        if not args.switch_every else []
+    hours = changes * args.song_minutes / 60
+
+    def per_change(value):
+        return f"{value / changes:.2f}" if changes else 'n/a'
+
+    lines = [f"Tracks published:          {replay.tracks} x {args.track_seconds}s",
+             f"Simulated play:            {hours:.1f} h ({args.song_minutes} min per song)",
+             f"Latency / error rate:      {args.latency} ms / {args.error_rate:.0%}",
+             f"Startup:                   {startup * 1000:.0f} ms",
+             f"Track changes seen:        {changes}",
+             f"Requests:                  {counts}",
+             f"Requests per track change: {per_change(requests)} "
+             f"(now-playing {per_change(counts.get('now-playing.json', 0))})",
+             f"Notifications:             {len(StubNotification.shown)}"]
+    if latencies:
+        lines.append(f"Notify latency:            median {percentile(latencies, 0.5):.2f}s, "
+                     f"p95 {percentile(latencies, 0.95):.2f}s, max {max(latencies):.2f}s")
+    if menu_times:
+        lines.append(f"Menu updates:              {len(menu_times)}, "
+                     f"median {percentile(menu_times, 0.5) * 1000:.2f} ms, "
+                     f"p95 {percentile(menu_times, 0.95) * 1000:.2f} ms")
+    growth = memory[-1] - memory[0]
+    lines.append(f"Memory (RSS):              start {rss_start:.1f} MB, "
+                 f"after init {memory[0]:.1f} MB, end {memory[-1]:.1f} MB, "
+                 f"peak {max(memory):.1f} MB")
+    if hours:
+        lines.append(f"Memory growth:             {growth / hours:+.2f} MB per simulated hour")
+    lines.append('')
+    lines.append(radio.metrics.render())
+    return '\n'.join(lines)
+
+
+def record(args):
+    """Record the changes of the live now-playing.json for replays.
+
+    Args:
+        args (argparse.Namespace): record arguments
+    """
+    last = None
+    recorded = 0
+    with open(args.path, mode='a', encoding='utf-8') as record_file:
+        while recorded < args.count:
+            try:
+                with urlopen(args.url, timeout=10) as res:
+                    obj = json.loads(res.read().decode('utf-8'))
+            except (OSError, ValueError) as err:
+                print((f"Record: {err}"))
+                obj = None
+            if obj is not None and obj != last:
+                record_file.write(json.dumps(obj) + '\n')
+                record_file.flush()
+                last = obj
+                recorded += 1
+                print((f"Recorded {recorded}/{args.count}"))
+            sleep(args.interval)
+
+
+def main():
+    """ Parse the arguments and run the benchmark. """
+    parser = argparse.ArgumentParser(description='Offline kink-radio benchmark')
+    parser.add_argument('--tracks', type=int, default=60,
+                        help='number of generated track changes (default: 60)')
+    parser.add_argument('--track-seconds', type=float, default=5,
+                        help='real seconds between track changes (default: 5)')
+    parser.add_argument('--song-minutes', type=float, default=3.5,
+                        help='song length a track change stands for (default: 3.5)')
+    parser.add_argument('--replay', help='json lines file with recorded now-playing.json')
+    parser.add_argument('--latency', type=float, default=0,
+                        help='average server latency in ms (default: 0)')
+    parser.add_argument('--error-rate', type=float, default=0,
+                        help='part of the requests answered with 503 (default: 0)')
+    parser.add_argument('--wait', type=int, default=1,
+                        help='kink-radio wait setting in seconds (default: 1)')
+    parser.add_argument('--play', action='store_true', help='play the silent test stream')
+    parser.add_argument('--watch-all', action='store_true', help='follow all stations')
+    parser.add_argument('--switch-every', type=float, default=0,
+                        help='switch station every nr of track changes (default: 0, off)')
+    parser.add_argument('--output', help='also write the report to this file')
+    subparsers = parser.add_subparsers(dest='command')
+    recorder = subparsers.add_parser('record', help='record the live now-playing.json')
+    recorder.add_argument('path', help='json lines file to append to')
+    recorder.add_argument('--url', default='https://api.kink.nl/static/now-playing.json')
+    recorder.add_argument('--count', type=int, default=20, help='number of changes to record')
+    recorder.add_argument('--interval', type=float, default=10, help='seconds between requests')
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        record(args)
+        return
+
+    report = run(args)
+    print((report))
+    if args.output:
+        with open(args.output, mode='w', encoding='utf-8') as output:
+            output.write(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+#! /usr/bin/env python3
+
+"""On-disk album art cache.
+
+    Images are stored under a name derived from the hash of their url, so a
+    repeated song or a switch back to a station uses the file already on disk.
+    The least recently used images are removed when the cache grows beyond
+    the configured number of files or size. Images can be prefetched in a
+    bounded thread pool, e.g. the art of every station's current track.
+"""
+
+import os
+import hashlib
+from threading import Lock, RLock
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from os.path import join, exists, splitext
+from urllib.parse import urlparse
+from utils import atomic_write
+
+import requests
+
+# Suffix of partially downloaded files
+PART = '.part'
+
+
+class ArtCache():
+    """ Album art cache with least recently used eviction. """
+    def __init__(self, http, directory, max_files=200, max_size=20, workers=3):
+        self.http = http
+        self.directory = directory
+        self.max_files = max_files
+        # Maximum size in MB
+        self.max_bytes = max_size * 1024 * 1024
+        self.lock = Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Prefetch jobs by url
+        self.executor = ThreadPoolExecutor(max_workers=max(workers, 1),
+                                           thread_name_prefix='kink-art')
+        self.pending = {}
+        # Reentrant: a finished job's callback may run while submitting
+        self.pending_lock = RLock()
+
+    def path(self, url):
+        """Get the cache path of an image url.
+
+        Args:
+            url (str): image url
+
+        Returns:
+            str: path of the cached image
+        """
+        ext = splitext(urlparse(url).path)[1].lower()
+        if ext not in ('.jpg', '.jpeg', '.png', '.webp'):
+            ext = '.jpg'
+        return join(self.directory, hashlib.sha1(url.encode('utf-8')).hexdigest() + ext)
+
+    def get(self, url):
+        """Get the cached image and download it when it is not cached yet.
+
+        Args:
+            url (str): image url
+
+        Returns:
+            str: path of the cached image or empty string when not available
+        """
+        if not url:
+            return ''
+
+        # Wait for a running prefetch of the same image
+        with self.pending_lock:
+            future = self.pending.get(url)
+        if future:
+            try:
+                return future.result()
+            except CancelledError:
+                pass
+
+        return self._download(url)
+
+    def prefetch(self, urls):
+        """Download images in the background that are not cached yet.
+
+        Args:
+            urls (list): image urls
+        """
+        with self.pending_lock:
+            for url in set(urls):
+                if not url or url in self.pending or exists(self.path(url)):
+                    continue
+                future = self.executor.submit(self._download, url)
+                self.pending[url] = future
+                future.add_done_callback(lambda f, u=url: self._done(u))
+
+    def _done(self, url):
+        """Remove a finished prefetch job.
+
+        Args:
+            url (str): image url
+        """
+        with self.pending_lock:
+            self.pending.pop(url, None)
+
+    def _download(self, url):
+        """Download an image into the cache unless it is already cached.
+
+        Args:
+            url (str): image url
+
+        Returns:
+            str: path of the cached image or empty string when not available
+        """
+        path = self.path(url)
+        if exists(path):
+            # Mark as recently used
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            return path
+
+        try:
+            res = self.http.get(url)
+        except requests.RequestException as err:
+            print((f"Album art: {err}"))
+            return ''
+        if res.status_code != 200 or not res.content:
+            return ''
+
+        try:
+            atomic_write(path, res.content, suffix=PART)
+        except OSError as err:
+            print((f"Album art: {err}"))
+            return ''
+
+        self.evict()
+        return path
+
+    def evict(self):
+        """ Remove least recently used images until the cache is within its limits. """
+        with self.lock:
+            files = []
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if not entry.is_file() or entry.name.endswith(PART):
+                        continue
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+            files.sort()
+
+            total = sum(file[1] for file in files)
+            while files and (len(files) > self.max_files or total > self.max_bytes):
+                _mtime, size, path = files.pop(0)
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
+
+    def shutdown(self):
+        """ Cancel pending prefetch jobs. """
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,99 @@
+#! /usr/bin/env python3
+
+"""Connectivity monitor.
+
+    The availability of the KINK API is derived from the polling results,
+    with exponential backoff after failures. Gio.NetworkMonitor is only a
+    hint: a network change polls right away, but KINK is also polled while
+    the monitor says the machine is offline, as it misreports e.g. without a
+    default route.
+"""
+
+from random import uniform
+from threading import Lock
+
+import gi
+gi.require_version('Gio', '2.0')
+from gi.repository import Gio
+
+
+class Connectivity():
+    """ Combined network and KINK API state. """
+    def __init__(self, on_network_changed=None, max_backoff=300):
+        self.on_network_changed = on_network_changed
+        self.max_backoff = max_backoff
+        self.observers = []
+        self.lock = Lock()
+        # None until the first poll
+        self.api_up = None
+        self.failures = 0
+        self.was_online = None
+
+        self.monitor = Gio.NetworkMonitor.get_default()
+        self.network_up = self.monitor.get_network_available()
+        self.monitor.connect('network-changed', self._network_changed)
+
+    @property
+    def online(self):
+        """ KINK answered the last poll. """
+        return bool(self.api_up)
+
+    def subscribe(self, callback):
+        """Call callback when going on- or offline.
+
+        Args:
+            callback (obj): function with online (bool) as argument
+        """
+        self.observers.append(callback)
+
+    def _network_changed(self, monitor, available):
+        """Handle the Gio.NetworkMonitor network-changed signal.
+
+        Args:
+            monitor (Gio.NetworkMonitor): network monitor
+            available (bool): network is available
+        """
+        if available == self.network_up:
+            return
+        print((f"Network available: {available}"))
+        with self.lock:
+            self.network_up = available
+            # Check the API with the next poll: no backoff
+            self.failures = 0
+        if self.on_network_changed:
+            self.on_network_changed()
+
+    def api_result(self, success):
+        """Save the result of a KINK API request.
+
+        Args:
+            success (bool): KINK answered
+        """
+        with self.lock:
+            self.api_up = success
+            self.failures = 0 if success else self.failures + 1
+        self.publish()
+
+    def backoff(self, wait):
+        """Get the wait before the next API request after failures.
+
+        Args:
+            wait (float): normal wait in seconds
+
+        Returns:
+            float: wait doubled for each failure, with jitter
+        """
+        if self.failures <= 1:
+            return wait
+        backoff = min(wait * 2 ** (self.failures - 1), max(self.max_backoff, wait))
+        return uniform(backoff / 2, backoff)
+
+    def publish(self):
+        """ Call the observers when the online state changed, or the first time. """
+        with self.lock:
+            online = self.online
+            if online == self.was_online:
+                return
+            self.was_online = online
+        for callback in self.observers:
+            callback(online)
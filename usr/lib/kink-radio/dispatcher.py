@@ -0,0 +1,59 @@
+#! /usr/bin/env python3
+
+"""Thread-safe dispatcher for UI updates.
+
+    Gtk may only be used from the main loop. Background threads post their
+    UI changes here and the dispatcher applies them on the GLib main loop.
+    Updates posted with the same key within one frame are coalesced: only
+    the last one is applied.
+"""
+
+from threading import Lock
+
+import gi
+gi.require_version('GLib', '2.0')
+from gi.repository import GLib
+
+# One frame at 60 Hz in milliseconds
+FRAME_MS = 16
+
+
+class Dispatcher():
+    """ Queue UI updates and apply them once per frame on the main loop. """
+    def __init__(self, interval=FRAME_MS):
+        self.interval = interval
+        self.pending = {}
+        self.source_id = None
+        self.lock = Lock()
+
+    def post(self, key, function, *args):
+        """Queue a UI update, replacing a pending update with the same key.
+
+        Args:
+            key (str): update category, e.g. 'menu' or 'icon'
+            function (obj): function to call on the main loop
+            args: function arguments
+        """
+        with self.lock:
+            # Re-insert so that updates run in the order they were last posted
+            self.pending.pop(key, None)
+            self.pending[key] = (function, args)
+            if self.source_id is None:
+                self.source_id = GLib.timeout_add(self.interval, self._flush)
+
+    def _flush(self):
+        """Apply all queued updates on the main loop.
+
+        Returns:
+            bool: False to remove the timeout source
+        """
+        with self.lock:
+            pending = self.pending
+            self.pending = {}
+            self.source_id = None
+        for key, (function, args) in pending.items():
+            try:
+                function(*args)
+            except Exception as err:
+                print((f"Dispatcher ({key}): {err}"))
+        return False
@@ -0,0 +1,133 @@
+#! /usr/bin/env python3
+
+"""Parser for the KINK now-playing feed.
+
+    Only the subtree of the selected station is read, in one pass, into a
+    compact Track record. Missing fields are reported instead of silently
+    ignored, and tracks are compared as tuples instead of diffing dicts.
+"""
+
+from scheduler import parse_timing
+
+# Paths of the track fields within obj['extended'][station]
+FIELDS = {'artist': ('artist',),
+          'title': ('title',),
+          'album_art': ('album_art', '320'),
+          'program': ('program', 'title')}
+
+
+class Track():
+    """ What's playing on a station. """
+    __slots__ = ('station', 'program', 'artist', 'title', 'album_art', 'timing')
+
+    def __init__(self, station='', program='', artist='', title='', album_art='', timing=None):
+        self.station = station
+        self.program = program
+        self.artist = artist
+        self.title = title
+        self.album_art = album_art
+        # Start time and duration: not part of the comparison
+        self.timing = timing
+
+    def key(self):
+        """Get the fields that identify the track.
+
+        Returns:
+            tuple: station, program, artist, title and album art
+        """
+        return (self.station, self.program, self.artist, self.title, self.album_art)
+
+    def __eq__(self, other):
+        return isinstance(other, Track) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return f"Track{self.key()}"
+
+
+def _lookup(data, path):
+    """Walk path in nested dictionaries.
+
+    Args:
+        data (dict): dictionary to search
+        path (tuple): keys to follow
+
+    Returns:
+        obj: value or None when a key is missing
+    """
+    for key in path:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def parse_track(obj, station):
+    """Extract the track of one station.
+
+    Args:
+        obj (dict): now playing data from KINK
+        station (str): KINK station
+
+    Returns:
+        tuple: Track and a list with the names of missing fields
+    """
+    data = _lookup(obj, ('extended', station))
+    if not isinstance(data, dict):
+        return Track(station=station), list(FIELDS)
+
+    values = {}
+    missing = []
+    for name, path in FIELDS.items():
+        value = _lookup(data, path)
+        if value is None:
+            missing.append(name)
+            value = ''
+        values[name] = str(value)
+    return Track(station=station, timing=parse_timing(data), **values), missing
+
+
+def parse_tracks(obj):
+    """Extract the tracks of all stations.
+
+    Args:
+        obj (dict): now playing data from KINK
+
+    Returns:
+        dict: Track by station
+    """
+    return {station: parse_track(obj, station)[0] for station in parse_stations(obj)}
+
+
+def parse_stations(obj):
+    """Get the sorted station names.
+
+    Args:
+        obj (dict): now playing data from KINK
+
+    Returns:
+        list: list with available KINK stations
+    """
+    stations = _lookup(obj, ('stations',))
+    if not isinstance(stations, dict):
+        return []
+    return sorted(stations)
+
+
+def parse_album_arts(obj):
+    """Get the album art urls of all stations.
+
+    Args:
+        obj (dict): now playing data from KINK
+
+    Returns:
+        list: album art urls
+    """
+    urls = []
+    for station in parse_stations(obj):
+        url = _lookup(obj, ('extended', station) + FIELDS['album_art'])
+        if url:
+            urls.append(url)
+    return urls
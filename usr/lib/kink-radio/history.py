@@ -0,0 +1,139 @@
+#! /usr/bin/env python3
+
+"""Persistent play history.
+
+    Played songs are stored in an SQLite database in WAL mode with indexes
+    on station, artist and time. Writes are buffered and committed in
+    batches. Entries older than the configured number of days are removed.
+"""
+
+import sqlite3
+from threading import Lock
+from time import time, strftime, localtime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plays (
+    time REAL NOT NULL,
+    station TEXT NOT NULL,
+    program TEXT NOT NULL DEFAULT '',
+    artist TEXT NOT NULL DEFAULT '',
+    title TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS plays_time ON plays (time);
+CREATE INDEX IF NOT EXISTS plays_station ON plays (station, time);
+CREATE INDEX IF NOT EXISTS plays_artist ON plays (artist COLLATE NOCASE, time);
+"""
+
+
+class History():
+    """ Play history with buffered writes. """
+    def __init__(self, path, keep_days=365, flush_size=10, flush_interval=300):
+        self.keep_days = keep_days
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.flushed = time()
+        self.rotated = 0
+        self.lock = Lock()
+
+        # The connection is shared between the polling thread and the main loop
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self.rotate()
+
+    def add(self, station, program='', artist='', title=''):
+        """Add a played song and write the buffer when it is full or old.
+
+        Args:
+            station (str): KINK station
+            program (str, optional): program title. Defaults to ''.
+            artist (str, optional): artist. Defaults to ''.
+            title (str, optional): song title. Defaults to ''.
+        """
+        with self.lock:
+            self.buffer.append((time(), station, program, artist, title))
+            if len(self.buffer) < self.flush_size and \
+               time() - self.flushed < self.flush_interval:
+                return
+        self.flush()
+
+    def flush(self):
+        """ Write buffered songs in one transaction. """
+        with self.lock:
+            self.flushed = time()
+            if not self.buffer:
+                return
+            with self.conn:
+                self.conn.executemany('INSERT INTO plays VALUES (?, ?, ?, ?, ?)', self.buffer)
+            self.buffer = []
+
+        # Rotate once a day in long running sessions
+        if time() - self.rotated > 86400:
+            self.rotate()
+
+    def rotate(self):
+        """ Remove songs older than the configured number of days. """
+        self.rotated = time()
+        if self.keep_days <= 0:
+            return
+        with self.lock, self.conn:
+            self.conn.execute('DELETE FROM plays WHERE time < ?',
+                              (time() - self.keep_days * 86400,))
+
+    def query(self, station=None, artist=None, since=None, limit=None):
+        """Get played songs, most recent first.
+
+        Args:
+            station (str, optional): only songs of this station. Defaults to None.
+            artist (str, optional): only songs of this artist. Defaults to None.
+            since (float, optional): only songs played after this timestamp. Defaults to None.
+            limit (int, optional): maximum number of songs. Defaults to None (all).
+
+        Returns:
+            list: tuples with time, station, program, artist and title
+        """
+        self.flush()
+        where = []
+        args = []
+        if station:
+            where.append('station = ?')
+            args.append(station)
+        if artist:
+            where.append('artist = ? COLLATE NOCASE')
+            args.append(artist)
+        if since:
+            where.append('time >= ?')
+            args.append(since)
+        sql = 'SELECT time, station, program, artist, title FROM plays'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY time DESC'
+        if limit:
+            sql += ' LIMIT ?'
+            args.append(limit)
+        with self.lock:
+            return self.conn.execute(sql, args).fetchall()
+
+    def export(self, path, **kwargs):
+        """Write played songs to a tab delimited text file.
+
+        Args:
+            path (str): text file path
+            kwargs: query filters
+
+        Returns:
+            int: number of exported songs
+        """
+        rows = self.query(**kwargs)
+        with open(file=path, mode='w', encoding='utf-8') as log:
+            for played, station, program, artist, title in rows:
+                played = strftime('%Y-%m-%d %H:%M', localtime(played))
+                log.write(f"{played}\t{station}\t{artist}\t{title}\t{program}\n")
+        return len(rows)
+
+    def close(self):
+        """ Write buffered songs and close the database. """
+        self.flush()
+        self.conn.close()
@@ -0,0 +1,104 @@
+#! /usr/bin/env python3
+
+"""Track changes from ICY in-stream metadata.
+
+    Shoutcast/Icecast streams carry the StreamTitle ("Artist - Title") in
+    the audio stream, and VLC reports it with a MediaMetaChanged event. Once
+    the stream changed its title, a track change is known without a request.
+    The now-playing feed is then downloaded quickly after a change, for the
+    album art and program, until it has caught up with the stream.
+"""
+
+from time import monotonic
+
+import vlc
+
+# Download the feed quickly for at most this long after a change
+HOLD_SECONDS = 30
+
+
+def split_stream_title(stream_title):
+    """Split an ICY StreamTitle into artist and title.
+
+    Args:
+        stream_title (str): e.g. "Artist - Title"
+
+    Returns:
+        tuple: artist and title, the artist is empty when there is no separator
+    """
+    if ' - ' in stream_title:
+        artist, title = stream_title.split(' - ', 1)
+        return artist.strip(), title.strip()
+    return '', stream_title.strip()
+
+
+class IcyMetadata():
+    """ Now-playing titles of the active stream. """
+    def __init__(self, hold=HOLD_SECONDS):
+        self.hold = hold
+        # Last StreamTitle of the active stream, None until the stream sent one
+        self.stream_title = None
+        # The stream changed its title at least once: it follows the tracks
+        self.changed = False
+        # (artist, title, deadline) of a change the feed did not show yet
+        self.pending = None
+
+    def attach(self, media, callback):
+        """Call callback when the metadata of a stream changes.
+
+        Args:
+            media (vlc.Media): stream
+            callback (obj): function without arguments, called in a VLC thread
+        """
+        media.event_manager().event_attach(vlc.EventType.MediaMetaChanged,
+                                           lambda event: callback())
+
+    def reset(self):
+        """ Forget the titles, e.g. after switching stream or station. """
+        self.stream_title = None
+        self.changed = False
+        self.pending = None
+
+    @property
+    def active(self):
+        """ The active stream announced a track change with its titles. """
+        return self.changed
+
+    def check(self, list_player):
+        """Read the title of the active stream on the main loop.
+
+        Args:
+            list_player (vlc.MediaListPlayer): active player
+
+        Returns:
+            tuple: artist and title when the track changed, else None
+        """
+        media = list_player.get_media_player().get_media()
+        stream_title = media.get_meta(vlc.Meta.NowPlaying) if media else None
+        if not stream_title or stream_title == self.stream_title:
+            return None
+        first = self.stream_title is None
+        self.stream_title = stream_title
+        if first:
+            # The track that was already playing
+            return None
+        self.changed = True
+        artist, title = split_stream_title(stream_title)
+        self.pending = (artist, title, monotonic() + self.hold)
+        return artist, title
+
+    def caught_up(self, track):
+        """Check if the feed shows the track the stream announced.
+
+        Args:
+            track (Track): current track from the feed
+
+        Returns:
+            bool: no change is waiting for the feed
+        """
+        if not self.pending:
+            return True
+        _artist, title, deadline = self.pending
+        if (title and title.lower() in track.title.lower()) or monotonic() > deadline:
+            self.pending = None
+        return self.pending is None
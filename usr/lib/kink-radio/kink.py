@@ -8,6 +8,7 @@
     i18n:         http://docs.python.org/3/library/gettext.html
     notify:       https://lazka.github.io/pgi-docs/#Notify-0.7
     appindicator: https://lazka.github.io/pgi-docs/#AyatanaAppIndicator3-0.1
+    mpris:        https://specifications.freedesktop.org/mpris-spec/latest/
     requests:     https://requests.readthedocs.io/en/latest
     vlc:          https://www.olivieraubert.net/vlc/python-ctypes/doc/
     Author:       Arjen Balfoort, 17-06-2025
@@ -16,143 +17,355 @@
 import gettext
 import os
 import subprocess
-import json
-from enum import Enum
+from datetime import date, datetime
 from shutil import copyfile
 from pathlib import Path
-from configparser import ConfigParser
 from os.path import abspath, dirname, join, exists
 from threading import Event, Thread
+from time import monotonic
 from utils import str_int, str_bool
+from worker import Worker
+from history import History
+from settings import Settings
+from state import State
+from scheduler import PollScheduler
+from feed import Track, parse_track, parse_tracks, parse_stations, parse_album_arts
+from connectivity import Connectivity
+from standby import StandbyPool
+from profiles import PROFILE_PREFIX, METERED, instance_args, media_options
+from dispatcher import Dispatcher
+from metrics import Metrics
+from mpris import Mpris
 
-import vlc
-import requests
 import gi
-gi.require_version('Gtk', '3.0')
-gi.require_version('Notify', '0.7')
-from gi.repository import Gtk, Notify
-gi.require_version('AyatanaAppIndicator3', '0.1')
-from gi.repository import AyatanaAppIndicator3 as AppIndicator3
+gi.require_version('GLib', '2.0')
+from gi.repository import GLib
 
 APP_ID = 'kink-radio'
 APP_NAME = 'ꓘINK Radio'
+# Settings shown in the menu
+# Settings with the station playlist urls
+STREAM_KEYS = ('stream_kink', 'stream_dna', 'stream_indie', 'stream_distortion')
+MENU_KEYS = {'notification_timeout', 'autoplay', 'autostart', 'station', 'watch_all', 'profile'}
 _ = gettext.translation(APP_ID, fallback=True).gettext
 
-class MenuIcons(Enum):
-    """ Enum with icon names or paths """
-    PLAY = 'media-playback-start'
-    STOP = 'media-playback-stop'
-    SELECT = 'dialog-ok-apply'
-
-
 class KinkRadio():
     """ Connect to Kink radio and show info in system tray. """
-    def __init__(self):
+    def __init__(self, headless=False, started=None):
+        # Startup time is measured from here or from the given monotonic() time
+        self.started = started or monotonic()
         # Initiate variables
         self.scriptdir = abspath(dirname(__file__))
         self.home = str(Path.home())
         self.local = join(self.home, f".{APP_ID}")
         self.playlist = join(self.local, f"{APP_ID}.txt")
         self.default_settings = join(self.scriptdir, 'settings.ini')
-        self.settings = join(self.local, 'settings.ini')
-        self.tmp_thumb = join(self.local, 'album_art.jpg')
+        self.settings_path = join(self.local, 'settings.ini')
+        self.thumb = ''
         self.grey_icon = join(self.scriptdir, f"{APP_ID}-grey.svg")
-        self.instance = vlc.Instance('--intf dummy')
-        self.list_player = self.instance.media_list_player_new()
-        self.cur_playing = {'station': '', 'program': '',
-                            'artist': '','title': '', 'album_art': ''}
-        # Use dict to negate the mutability of self.cur_playing
-        self.prev_playing = dict(self.cur_playing)
-
-        # to keep comments, you have to trick configparser into believing that
-        # lines starting with ";" are not comments, but they are keys without a value.
-        # Set comment_prefixes to a string which you will not use in the config file
-        self.conf_parser = ConfigParser(comment_prefixes='/', allow_no_value=True)
+        self.cur_playing = Track()
+        self.prev_playing = Track()
+        # Fields missing in the last parsed track
+        self.missing_fields = []
+        # Current track of every station when following all stations
+        self.station_tracks = {}
+        self.stations = []
+        # Tray icon, menu and notifications: None when running headless
+        self.tray = None
+        self.mpris = None
+        self.loop = GLib.MainLoop()
+        # Apply UI changes from background threads on the main loop
+        self.dispatcher = Dispatcher()
 
         # Create local directory
         os.makedirs(self.local, exist_ok=True)
         # Create conf file if it does not already exist
-        if not exists(self.settings):
-            copyfile(self.default_settings, self.settings)
+        if not exists(self.settings_path):
+            copyfile(self.default_settings, self.settings_path)
 
-        # Read the default and user ini into dictionaries
-        self.kink_dict = self.read_ini(self.settings)
-        self.kink_dict_default = self.read_ini(self.default_settings)
+        # Read the default and user ini once and keep them in memory
+        self.settings = Settings(path=self.settings_path,
+                                 default_path=self.default_settings)
+        self.settings.subscribe(self._settings_changed)
 
         # Save settings in variables
-        self.wait = max(str_int(self.key_value('wait')), 1)
+        self.wait = max(self.settings.get_int('wait'), 1)
+
+        # Last known stations and tracks: menus and "Now playing" work before
+        # the first poll and while offline
+        self.state = State(path=join(self.local, 'state.json'))
+        self.stations = self.state.stations()
+        self.cur_playing = self.state.track(self.key_value('station'))
+        # Do not notify and log the restored track again
+        self.prev_playing = self.cur_playing
+        self.thumb = self.state.thumb(self.key_value('station'))
+        if self.settings.get_bool('watch_all'):
+            self.station_tracks = self.state.tracks()
+
+        # Timings and counters of polling, downloads, the menu and playback
+        self.metrics = Metrics(enabled=self.settings.get_bool('metrics'))
+
+        # Thread pool for network jobs started from the main loop
+        self.worker = Worker()
+
+        # Network and VLC are set up in the background: see _load_backend
+        self.ready = False
+        # Error that stopped the background setup, raised again by main
+        self.error = None
+        self.play_when_ready = self.settings.get_bool('autoplay')
+        self.http = None
+        self.art_cache = None
+        self.now_playing = None
+        self.pls = None
+        self.cur_pls = ''
+        self.watchdog = None
+        self.instance = None
+        self.list_player = None
+        self.icy = None
+
+        # Recently used stations kept playing muted for instant switching
+        self.standby = StandbyPool(size=self._standby_size(),
+                                   keep_minutes=self.settings.get_int('standby_minutes', 15))
 
         # Create event to use when thread is done
         self.check_done_event = Event()
-        # Create global indicator object
-        self.indicator = AppIndicator3.Indicator.new(APP_ID,
-                                                     APP_ID,
-                                                     AppIndicator3.IndicatorCategory.OTHER)
-        self.indicator.set_title(APP_NAME)
-        self.indicator.set_status(AppIndicator3.IndicatorStatus.ACTIVE)
-        self.indicator.set_menu(self._build_menu())
+        self.poll_thread = None
+        # Plan the next poll around the expected track change
+        self.scheduler = PollScheduler(min_wait=self.wait,
+                                       max_wait=self.settings.get_int('wait_max', 60),
+                                       idle_wait=self.settings.get_int('wait_idle', 120),
+                                       adaptive=self.settings.get_bool('adaptive_polling'),
+                                       boundary_wait=max(self.settings.get_int('wait_min', 3), 1))
+        # Follow network changes and back off while KINK is unreachable
+        self.connectivity = Connectivity(on_network_changed=self.scheduler.wake,
+                                         max_backoff=self.settings.get_int('wait_offline_max', 300))
+        self.connectivity.subscribe(self._connection_changed)
+        # GTK is only loaded for the tray front end
+        if not headless:
+            from tray import Tray
+            self.tray = Tray(kink=self, app_id=APP_ID, title=APP_NAME,
+                             notify_interval=max(self.settings.get_float('notification_interval'), 0))
+        self.metrics.set('startup_tray_seconds', monotonic() - self.started)
+
+        # Persistent play history
+        self.history = History(path=join(self.local, 'history.db'),
+                               keep_days=self.settings.get_int('history_days', 365),
+                               flush_size=max(self.settings.get_int('history_flush'), 1))
+
+        # Import and set up network and VLC without delaying the tray icon
+        self.worker.submit(self._load_backend, callback=self._backend_ready,
+                           error_callback=self._backend_failed)
+
+    def _load_backend(self):
+        """Import requests and VLC and create the network and player objects.
+
+        Runs in the thread pool.
 
-        # Init notifier
-        Notify.init(APP_NAME)
+        Returns:
+            vlc.Instance: VLC with the options of the playback profile
+        """
+        from net import HttpClient
+        from artcache import ArtCache
+        from nowplaying import NowPlaying
+        from pls import PlsResolver
+        from watchdog import PlaybackWatchdog
+        from icy import IcyMetadata
+
+        # Pooled keep-alive connections for all network I/O
+        self.http = HttpClient(timeout=self.wait,
+                               retries=max(self.settings.get_int('http_retries'), 0),
+                               backoff=max(self.settings.get_float('http_backoff'), 0),
+                               pool_size=max(self.settings.get_int('http_pool_size'), 1),
+                               metrics=self.metrics)
+
+        # Album art cache
+        self.art_cache = ArtCache(http=self.http,
+                                  directory=join(self.local, 'album-art'),
+                                  max_files=max(self.settings.get_int('art_cache_files'), 1),
+                                  max_size=max(self.settings.get_int('art_cache_size'), 1),
+                                  workers=self.settings.get_int('art_prefetch_workers', 3))
+
+        # Shared now-playing data: downloaded once per freshness window
+        self.now_playing = NowPlaying(http=self.http,
+                                      url=self.key_value('json'),
+                                      max_age=max(self.settings.get_int('json_max_age'), 0))
+
+        # Stream urls from the station playlists, starting with the saved streams
+        self.pls = PlsResolver(http=self.http,
+                               ttl=self.settings.get_int('pls_ttl', 3600))
+        self.pls.load(self.state.streams())
+
+        # Reconnect when the stream stops while it should be playing
+        self.watchdog = PlaybackWatchdog(reconnect=self._reconnect,
+                                         max_backoff=self.settings.get_int('reconnect_max', 60))
+
+        # Track changes from the stream's own metadata
+        if self.settings.get_bool('icy_metadata'):
+            self.icy = IcyMetadata()
+        return self._new_instance()
+
+    def _backend_ready(self, instance):
+        """Start the player and the polling on the main loop.
 
-        # Reset log
-        if exists(self.playlist):
-            os.remove(self.playlist)
+        Args:
+            instance (vlc.Instance): VLC created in the background
+        """
+        if self.check_done_event.is_set():
+            instance.release()
+            return
+        self.instance = instance
+        self.list_player = self._new_list_player()
+        self.watchdog.watch(self.list_player)
+        GLib.timeout_add_seconds(max(self.settings.get_int('watchdog_interval', 5), 1),
+                                 self.watchdog.check)
+        self.ready = True
+
+        # Media keys and remote control over D-Bus
+        if self.settings.get_bool('mpris'):
+            self.mpris = Mpris(kink=self, identity=APP_NAME, desktop_entry=APP_ID)
+
+        # Export the metrics
+        if self.metrics.enabled:
+            self.metrics.add_collector(self._metrics_stats)
+            if self.settings.get_int('metrics_port') > 0:
+                self.metrics.serve(self.settings.get_int('metrics_port'))
+            if self.settings.get_int('metrics_interval') > 0:
+                GLib.timeout_add_seconds(self.settings.get_int('metrics_interval'),
+                                         self.metrics.write, join(self.local, 'stats.prom'))
+
+        # Resolve the playlists of all stations in the background
+        self.worker.submit(self._resolve_streams)
 
         # Load the configured playlist
         self._add_playlist()
-        if str_bool(self.key_value('autoplay')):
+        if self.play_when_ready:
             self.play_kink()
         else:
             self.stop_kink()
+        self.metrics.set('startup_ready_seconds', monotonic() - self.started)
 
         # Start thread to check for connection changes
-        Thread(target=self._run_check).start()
+        self.poll_thread = Thread(target=self._poll)
+        self.poll_thread.start()
+
+    def _backend_failed(self, err):
+        """Stop when network or VLC could not be set up.
+
+        Without them the radio cannot play: quit and let main raise the error,
+        so the tray shows the error dialog and the daemon exits with an error.
+
+        Args:
+            err (Exception): error raised by _load_backend
+        """
+        self.error = err
+        self.quit()
+
+    def _poll(self):
+        """ Poll KINK until quit, then close what the polling uses. """
+        try:
+            self._run_check()
+        finally:
+            self._close_backend()
+
+    def _close_backend(self):
+        """ Close the album art cache, the connections and the history. """
+        if self.art_cache:
+            self.art_cache.shutdown()
+        if self.http:
+            self.http.close()
+        self.history.close()
+        self.state.flush()
 
     def _run_check(self):
         """ Poll Kink for currently playing song. """
-        was_connected = True
+        version = None
 
         while not self.check_done_event.is_set():
+            # Get the now-playing data once for this loop
+            self.metrics.inc('poll_wakeups_total')
+            with self.metrics.timer('now_playing_seconds'):
+                obj = self.now_playing.get()
+            # Quit may have been asked during the download
+            if self.check_done_event.is_set():
+                break
+
             # Check if kink server is online
-            if not self._is_connected():
-                # Show lost connection message
-                if was_connected:
-                    self.indicator.set_menu(self._build_menu())
-                    self.indicator.set_icon_full(self.grey_icon, '')
-                    unable_string = _('Unable to connect to:')
-                    self.show_notification(summary=f"{unable_string} {self.key_value('station')}",
-                                           thumb=APP_ID)
-                    was_connected = False
-            else:
-                # In case we had lost our connection
-                if not was_connected:
-                    # Build menu and show normal icon
-                    self.indicator.set_menu(self._build_menu())
-                    self.indicator.set_icon_full(APP_ID, '')
-                    was_connected = True
-
-                # Check if there is new playing data
-                self._fill_cur_playing()
-                if self.cur_playing != self.prev_playing:
-                    # Get album art
-                    self._save_thumb(self.cur_playing['album_art'])
-
-                    # Send notification
-                    self.show_song_info()
-
-                    # Keep a simple log
-                    playing = (f"{self.key_value('station')}: "
-                               f"{self.cur_playing['artist']} - {self.cur_playing['title']}")
-                    print((playing))
-                    with open(file=self.playlist, mode='a', encoding='utf-8') as log:
-                        log.write(f"{playing}\n")
-
-                    # Save playing data for the next loop
-                    self.prev_playing = dict(self.cur_playing)
+            self.connectivity.api_result(obj is not None)
+            if obj is not None:
+                # Nothing to parse or compare when KINK returned 304 Not Modified
+                # and the station did not change
+                if self.now_playing.version != version or \
+                   self.prev_playing.station != self.key_value('station'):
+                    version = self.now_playing.version
+
+                    # Rebuild the menu when the station list changed
+                    stations = parse_stations(obj)
+                    if stations != self.stations:
+                        self.stations = stations
+                        self.state.set_stations(stations)
+                        self.update_menu()
+
+                    # Warm the album art of all stations for quick station switches
+                    if self.settings.get_bool('art_prefetch') and not self.is_metered():
+                        self.art_cache.prefetch(parse_album_arts(obj))
+
+                    # Follow the other stations with the same data
+                    if self.settings.get_bool('watch_all'):
+                        self._watch_stations(obj)
+                    elif self.station_tracks:
+                        self.station_tracks = {}
+                        self.update_menu()
+
+                    # Check if there is new playing data
+                    self._fill_cur_playing(obj)
+                    if self.cur_playing != self.prev_playing:
+                        # Learn how long songs last on this station
+                        if self.cur_playing.station == self.prev_playing.station:
+                            self.scheduler.track_changed()
+
+                        self.metrics.inc('track_changes_total')
+
+                        # Get album art
+                        with self.metrics.timer('album_art_seconds'):
+                            self.thumb = self.art_cache.get(self.cur_playing.album_art)
+
+                        # Send notification
+                        self.show_song_info()
+                        self.update_menu()
+                        self.state.set_track(self.cur_playing, self.thumb)
+
+                        # Keep the play history
+                        playing = (f"{self.key_value('station')}: "
+                                   f"{self.cur_playing.artist} - {self.cur_playing.title}")
+                        print((playing))
+                        self.history.add(station=self.cur_playing.station,
+                                         program=self.cur_playing.program,
+                                         artist=self.cur_playing.artist,
+                                         title=self.cur_playing.title)
+
+                        # Save playing data for the next loop
+                        self.prev_playing = self.cur_playing
+
+            # Release standby players that were kept long enough
+            if self.standby.players:
+                self.dispatcher.post('standby', self.standby.expire)
 
             # Wait until we continue with the loop
-            self.check_done_event.wait(self.wait)
+            if obj is None:
+                # Back off while KINK is unreachable
+                delay = self.connectivity.backoff(self.wait)
+            else:
+                delay = self.scheduler.next_delay(timing=self.cur_playing.timing,
+                                                  playing=self.is_playing(),
+                                                  expires_in=self.now_playing.expires_in())
+                if self.icy and self.icy.active and self.is_playing():
+                    if not self.icy.caught_up(self.cur_playing):
+                        # Download the feed quickly until it shows the announced track
+                        delay = max(self.wait, self.now_playing.expires_in())
+                    else:
+                        # The stream announces the next change and wakes us
+                        delay = max(delay, self.scheduler.idle_wait)
+            self.scheduler.wait(delay)
 
     # ===============================================
     # Kink functions
@@ -166,52 +379,46 @@ class KinkRadio():
             artist = _('Artist')
             title = _('Title')
             self.show_notification(summary=f"{self.key_value('station')}: "
-                                           f"{self.cur_playing['program']}",
-                                   body=(f"<b>{artist}</b>: {self.cur_playing['artist']}\n"
-                                         f"<b>{title}</b>: {self.cur_playing['title']}"),
-                                   thumb=self.tmp_thumb)
+                                           f"{self.cur_playing.program}",
+                                   body=(f"<b>{artist}</b>: {self.cur_playing.artist}\n"
+                                         f"<b>{title}</b>: {self.cur_playing.title}"),
+                                   thumb=self.thumb or APP_ID)
 
-    def _save_thumb(self, url):
-        """Retrieve image data from url and save to path
+    def _watch_stations(self, obj):
+        """Update the track table of all stations and log their changes.
 
         Args:
-            url (str): image url
+            obj (dict): now playing data from KINK
         """
-        if not url:
-            if exists(self.tmp_thumb):
-                os.remove(self.tmp_thumb)
+        tracks = parse_tracks(obj)
+        if tracks == self.station_tracks:
             return
-        res = requests.get(url, timeout=self.wait)
-        if res.status_code == 200:
-            with open(file=self.tmp_thumb, mode='wb') as file:
-                file.write(res.content)
 
-    def _json_request(self):
-        """Get json data from KINK.
-
-        Returns:
-            json: now playing data from KINK
-        """
-        res = requests.get(self.key_value('json'), timeout=self.wait)
-        if res.status_code == 200:
-            return json.loads(res.text)
-        return None
-
-    def get_stations(self):
-        """Get lists of Kink stations
-
-        Returns:
-            list: list with available KINK stations
-        """
-        obj = self._json_request()
-        if obj:
-            s_dict = obj['stations']
-        else:
-            return []
-        stations = list(s_dict.keys())
-        stations.sort()
-
-        return stations
+        watched = {artist.strip().lower() for artist in
+                   self.key_value('watch_artists').split(',') if artist.strip()}
+        cur_station = self.key_value('station')
+        for station, track in tracks.items():
+            prev_track = self.station_tracks.get(station)
+            # The selected station is handled by the main loop
+            if track == prev_track or station == cur_station or \
+               not (track.artist or track.title):
+                continue
+            # Do not log the tracks already playing when the table is first filled
+            if prev_track:
+                self.history.add(station=station,
+                                 program=track.program,
+                                 artist=track.artist,
+                                 title=track.title)
+            self.state.set_track(track)
+            if track.artist.lower() in watched:
+                now_on = _('Now on')
+                self.show_notification(summary=f"{now_on} {station}: {track.artist}",
+                                       body=track.title,
+                                       thumb=self.art_cache.get(track.album_art) or APP_ID,
+                                       key='watch')
+
+        self.station_tracks = tracks
+        self.update_menu()
 
     def switch_station(self, key, value):
         """Switch KINK station.
@@ -219,253 +426,383 @@ class KinkRadio():
         Args:
             station (str): KINK station name
         """
-        if key != 'station' or value == self.key_value('station'):
+        prev_station = self.key_value('station')
+        if key != 'station' or value == prev_station:
             return
         self.save_key('station', value)
         print((f"Switch station: {self.key_value('station')}"))
+        # Show the station's last known track until the new data arrives
+        self.cur_playing = self.state.track(value)
+        self.thumb = self.state.thumb(value)
+        # Songs on the new station change at other times
+        self.scheduler.reset()
+        if not self.ready:
+            # The station is used when VLC is loaded
+            self.update_menu()
+            return
 
         was_playing = False
-        if self.list_player.is_playing():
+        if self.is_playing():
+            if self.standby.enabled:
+                self._swap_player(prev_station, value)
+                self.update_menu()
+                self.refresh()
+                return
             self.stop_kink()
             was_playing = True
         self._add_playlist()
         if was_playing:
             self.play_kink()
 
-        self.indicator.set_menu(self._build_menu())
+        self.update_menu()
 
-    def _fill_cur_playing(self):
-        """Get what's playing data from Kink."""
-        obj = self._json_request()
-        program = ''
-        artist = ''
-        title = ''
-        album_art = ''
+        # Get the new station's data without blocking the menu
+        self.refresh()
+
+    def refresh(self):
+        """ Download the now-playing data in the background. """
+        self.worker.submit(self.now_playing.get, True, callback=self._on_refresh)
+
+    def _on_refresh(self, obj):
+        """Update the menu with freshly downloaded data on the main loop.
+
+        Args:
+            obj (dict): now playing data from KINK
+        """
         if obj:
-            try:
-                artist = obj['extended'][self.key_value('station')]['artist']
-            except Exception:
-                pass
-            try:
-                title = obj['extended'][self.key_value('station')]['title']
-            except Exception:
-                pass
-            try:
-                album_art = obj['extended'][self.key_value('station')]['album_art']['320']
-            except Exception:
-                pass
-            try:
-                program = obj['extended'][self.key_value('station')]['program']['title']
-            except Exception:
-                pass
-
-        self.cur_playing['station'] = self.key_value('station')
-        self.cur_playing['program'] = program
-        self.cur_playing['artist'] = artist
-        self.cur_playing['title'] = title
-        self.cur_playing['album_art'] = album_art
-
-    def _is_connected(self):
-        """Check if Kink is online.
+            self.stations = parse_stations(obj)
+            self.state.set_stations(self.stations)
+            self.update_menu()
+        # Let the polling thread handle the new data right away
+        self.scheduler.wake()
+
+    def _fill_cur_playing(self, obj):
+        """Get what's playing data from Kink.
+
+        Args:
+            obj (dict): now playing data from KINK
+        """
+        self.cur_playing, missing = parse_track(obj, self.key_value('station'))
+        # Report schema changes once
+        if missing != self.missing_fields:
+            self.missing_fields = missing
+            if missing:
+                print((f"Missing in now-playing data: {', '.join(missing)}"))
+
+    def is_connected(self):
+        """Check if the network is up and Kink was online during the last download.
 
         Returns:
             bool: able to connect to KINK or not
         """
-        res = requests.get(self.key_value('json'), timeout=self.wait)
-        if res.status_code == 200:
-            return True
-        return False
+        return self.connectivity.online
+
+    def _connection_changed(self, online):
+        """Show the connection state in the icon, menu and a notification.
 
-    def _get_pls(self):
+        Args:
+            online (bool): network is available and KINK answers
+        """
+        self.update_menu()
+        if online:
+            self.set_icon(APP_ID)
+            # The connection error is no longer relevant
+            if self.tray:
+                self.dispatcher.post('connection', self.tray.close_notification, 'connection')
+        else:
+            # Show lost connection message
+            self.set_icon(self.grey_icon)
+            unable_string = _('Unable to connect to:')
+            self.show_notification(summary=f"{unable_string} {self.key_value('station')}",
+                                   thumb=APP_ID,
+                                   key='connection')
+
+    def _get_pls(self, station=None):
         """Get the station playlist url
 
+        Args:
+            station (str, optional): KINK station. Defaults to the current station.
+
         Returns:
-            str: play list url for current station
+            str: play list url for the station
         """
-        if self.key_value('station') == 'kink':
+        station = station or self.key_value('station')
+        if station == 'kink':
             return self.key_value('stream_kink')
-        if 'dna' in self.key_value('station'):
+        if 'dna' in station:
             return self.key_value('stream_dna')
-        if 'distortion' in self.key_value('station'):
+        if 'distortion' in station:
             return self.key_value('stream_distortion')
         return self.key_value('stream_indie')
 
+    def _resolve_streams(self):
+        """ Resolve the playlists of all stations, checking the selected station's streams. """
+        cur_pls = self._get_pls()
+        for key in STREAM_KEYS:
+            url = self.key_value(key)
+            # Health checks connect to every mirror: not on a metered connection
+            self.pls.resolve(url, check=url == cur_pls and not self.is_metered())
+        self._save_streams()
+
+    def _save_streams(self, *args):
+        """ Save the resolved stream urls for the next start. """
+        self.state.set_streams(self.pls.snapshot())
+
+    def is_metered(self):
+        """Check if the metered connection profile is selected.
+
+        Returns:
+            bool: limit background downloads
+        """
+        return self.key_value('profile') == METERED
+
+    def _standby_size(self):
+        """Get the number of standby players allowed by settings and profile.
+
+        Returns:
+            int: number of standby players
+        """
+        if self.is_metered():
+            return 0
+        return max(self.settings.get_int('standby_players'), 0)
+
+    def _profile_options(self):
+        """Get the VLC options of the selected playback profile.
+
+        Returns:
+            str: VLC command line options
+        """
+        try:
+            return self.key_value(PROFILE_PREFIX + self.key_value('profile')) or ''
+        except KeyError:
+            print((f"Unknown playback profile: {self.key_value('profile')}"))
+            return ''
+
+    def _apply_profile(self):
+        """ Restart VLC with the options of the selected playback profile. """
+        if not self.ready:
+            # The profile is used when VLC is loaded
+            return
+        print((f"Playback profile: {self.key_value('profile')}"))
+        # Creating VLC is slow: keep the current player until the new one is ready
+        self.worker.submit(self._new_instance, callback=self._profile_ready)
+
+    def _profile_ready(self, instance):
+        """Switch to the VLC instance of the new playback profile.
+
+        Args:
+            instance (vlc.Instance): VLC created in the background
+        """
+        if self.check_done_event.is_set():
+            instance.release()
+            return
+        old_instance = self.instance
+        old_player = self.list_player
+        was_playing = old_player.is_playing()
+        # Standby players belong to the old instance
+        self.standby.clear()
+        self.standby.size = self._standby_size()
+
+        # Swap before releasing: the poll thread may use the player meanwhile
+        self.instance = instance
+        self.list_player = self._new_list_player()
+        self.watchdog.watch(self.list_player)
+        self._add_playlist()
+        old_player.stop()
+        if was_playing:
+            self.play_kink()
+        else:
+            self.update_menu()
+        old_player.release()
+        old_instance.release()
+
+    def _new_instance(self):
+        """Create VLC with the options of the playback profile.
+
+        Returns:
+            vlc.Instance: new VLC instance
+        """
+        # Loading libvlc is slow: only import VLC when it is needed
+        import vlc
+        return vlc.Instance(instance_args(self._profile_options()))
+
+    def _new_list_player(self):
+        """Create a VLC player that fails over to the next stream on errors.
+
+        Returns:
+            vlc.MediaListPlayer: new player
+        """
+        import vlc
+        list_player = self.instance.media_list_player_new()
+        # Try the next stream when VLC cannot play the current one
+        list_player.get_media_player().event_manager().event_attach(
+            vlc.EventType.MediaPlayerEncounteredError,
+            lambda event: self.dispatcher.post('failover', self._failover, list_player))
+        self.watchdog.attach(list_player)
+        return list_player
+
+    def _swap_player(self, prev_station, station):
+        """Switch to a station by swapping the playing VLC player.
+
+        Args:
+            prev_station (str): station that is playing now
+            station (str): station to switch to
+        """
+        warm_player = self.standby.take(station)
+        # Keep the current station connected and muted
+        self.standby.add(prev_station, self.list_player)
+        self.cur_pls = self._get_pls()
+        if warm_player:
+            print((f"Standby player: {station}"))
+            if self.icy:
+                self.icy.reset()
+            self.list_player = warm_player
+            self.watchdog.watch(self.list_player)
+            return
+        self.list_player = self._new_list_player()
+        self.watchdog.watch(self.list_player)
+        self._add_playlist()
+        self.list_player.play()
+        self.watchdog.started()
+
     def _add_playlist(self):
         """ Add playlist to VLC """
-        url = self._get_pls()
-        print((f"Playlist: {url}"))
+        self.cur_pls = self._get_pls()
+        # Connect to the resolved streams directly when known
+        streams = self.pls.cached(self.cur_pls)
+        if not streams:
+            streams = [self.cur_pls]
+            self.worker.submit(self.pls.resolve, self.cur_pls, False, not self.is_metered(),
+                               callback=self._save_streams)
+        print((f"Playlist: {self.cur_pls} ({len(streams)} streams)"))
+        options = media_options(self._profile_options())
         media_list = self.instance.media_list_new()
-        media_list.add_media(url)
+        if self.icy:
+            self.icy.reset()
+        for stream in streams:
+            media = self.instance.media_new(stream, *options)
+            if self.icy:
+                self.icy.attach(media, lambda: self.dispatcher.post('icy', self._icy_changed))
+            media_list.add_media(media)
         self.list_player.set_media_list(media_list)
 
+    def _icy_changed(self):
+        """ Handle a new title in the stream's metadata on the main loop. """
+        if not self.icy or not self.list_player:
+            return
+        change = self.icy.check(self.list_player)
+        if not change:
+            return
+        artist, title = change
+        print((f"Stream title: {artist} - {title}"))
+        self.metrics.inc('icy_changes_total')
+        if str_int(self.key_value('notification_timeout')) > 0:
+            # Notify right away: the notification is updated with the album art
+            # when the feed has the new track
+            artist_label = _('Artist')
+            title_label = _('Title')
+            self.show_notification(summary=f"{self.key_value('station')}: "
+                                           f"{self.cur_playing.program}",
+                                   body=(f"<b>{artist_label}</b>: {artist}\n"
+                                         f"<b>{title_label}</b>: {title}"),
+                                   thumb=APP_ID)
+        # Get the album art and program now
+        self.scheduler.wake()
+
+    def _failover(self, list_player):
+        """Continue with the next stream after a stream failed.
+
+        Args:
+            list_player (vlc.MediaListPlayer): player that failed
+        """
+        if list_player is not self.list_player:
+            # A standby player failed: it is released when it expires
+            return
+        media = self.list_player.get_media_player().get_media()
+        if media:
+            print((f"Stream failed: {media.get_mrl()}"))
+            self.pls.failed(self.cur_pls, media.get_mrl())
+        if self.list_player.next() == -1:
+            # No streams left: resolve the playlist again for the next play
+            self.worker.submit(self.pls.resolve, self.cur_pls, True, not self.is_metered(),
+                               callback=self._save_streams)
+        self.update_menu()
+
+    def _reconnect(self):
+        """ Reload the playlist and play it again. """
+        self.list_player.stop()
+        self._add_playlist()
+        self.list_player.play()
+        self.update_menu()
+
+    def is_playing(self):
+        """Check if the radio is playing.
+
+        Returns:
+            bool: VLC is loaded and playing
+        """
+        return self.list_player is not None and bool(self.list_player.is_playing())
+
     def play_kink(self):
         """ Play playlist """
+        if not self.ready:
+            # Play as soon as VLC is loaded
+            self.play_when_ready = True
+            self.update_menu()
+            return
         self.list_player.play()
-        self.indicator.set_menu(self._build_menu())
+        self.watchdog.started()
+        self.update_menu()
 
     def stop_kink(self):
         """ Stop playlist """
+        if not self.ready:
+            self.play_when_ready = False
+            self.update_menu()
+            return
+        self.watchdog.stopped()
         self.list_player.stop()
-        self.indicator.set_menu(self._build_menu())
+        if self.icy:
+            self.icy.reset()
+        # No need to keep other stations connected
+        self.standby.clear()
+        self.update_menu()
 
     # ===============================================
     # System Tray Icon
     # ===============================================
-    def _get_image(self, icon):
-        """Get GtkImage from icon name or path
+    def set_icon(self, icon):
+        """Change the tray icon on the main loop.
 
         Args:
-            icon (string): icon path
-
-        Returns:
-            Gtk.Image: image binary from path
+            icon (str): icon name or path
         """
-        if not icon:
-            return None
-        if exists(icon):
-            img = Gtk.Image.new_from_file(icon, Gtk.IconSize.MENU)
-        else:
-            img = Gtk.Image.new_from_icon_name(icon, Gtk.IconSize.MENU)
-        return img
+        if self.tray:
+            self.dispatcher.post('icon', self.tray.set_icon, icon)
 
-    def _menu_item(self, label="", icon=None, function=None, key=None, value=None):
-        """Create MenuItem with given arguments
+    def update_menu(self):
+        """ Update the menu on the main loop, once per frame. """
+        self.dispatcher.post('menu', self._update_menu)
 
-        Args:
-            label (str, optional): label. Defaults to "".
-            icon (str, optional): icon name/path. Defaults to None.
-            function (obj, optional): function to call when clicked. Defaults to None.
-            argument (str, optional): function argument. Defaults to None.
+    def _update_menu(self):
+        """ Update the menu items and the MPRIS properties in place. """
+        if self.tray:
+            with self.metrics.timer('menu_update_seconds'):
+                self.tray.update()
+        if self.mpris:
+            self.mpris.update()
 
-        Returns:
-            Gtk.MenuItem: menu item for Gtk.Menu
-        """
-        item = Gtk.MenuItem.new()
-        item_box = Gtk.Box.new(Gtk.Orientation.HORIZONTAL, 6)
-
-        if icon:
-            item_box.pack_start(self._get_image(icon=icon), False, False, 0)
-        if label:
-            item_box.pack_start(Gtk.Label.new(label), False, False, 0)
-
-        item.add(item_box)
-
-        if function and key:
-            item.connect('activate', lambda * a: function(key, value))
-        elif function:
-            item.connect('activate', lambda * a: function())
-        return item
-
-    def _build_menu(self):
-        """Build menu for the tray icon.
+    def _metrics_stats(self):
+        """Get the gauges read when the metrics are exported.
 
         Returns:
-            Gtk.Menu: indicator menu
+            dict: gauge name and value
         """
-        menu = Gtk.Menu()
-
-        # Kink menu
-        item_kink = Gtk.MenuItem.new_with_label(APP_NAME)
-        sub_menu_kink = Gtk.Menu()
-        site = self.key_value('site')
-        sub_menu_kink.append(self._menu_item(label=site[site.rfind('/') + 1:],
-                                             function=self.show_site))
-        sub_menu_kink.append(self._menu_item(label=_('Playlist'),
-                                             function=self.show_log))
-        item_kink.set_submenu(sub_menu_kink)
-        menu.append(item_kink)
-
-        # Settings
-        menu.append(Gtk.SeparatorMenuItem())
-        item_settings = Gtk.MenuItem.new_with_label(_('Settings'))
-        sub_menu_settings = Gtk.Menu()
-        select_icon = ""
-        new_notification_value = 10
-        if str_int(self.key_value('notification_timeout')) > 0:
-            select_icon = MenuIcons.SELECT.value
-            new_notification_value = 0
-        sub_menu_settings.append(self._menu_item(label=_("Show what's playing"),
-                                                 icon=select_icon,
-                                                 function=self.save_key,
-                                                 key='notification_timeout',
-                                                 value=new_notification_value))
-
-        select_icon = MenuIcons.SELECT.value if str_bool(self.key_value('autoplay')) else ''
-        sub_menu_settings.append(self._menu_item(label=_("Autoplay when starting"),
-                                                 icon=select_icon,
-                                                 function=self.save_key,
-                                                 key='autoplay',
-                                                 value=str(not str_bool(self.key_value('autoplay')))
-                                                       .lower()))
-
-        select_icon = MenuIcons.SELECT.value if str_bool(self.key_value('autostart')) else ''
-        sub_menu_settings.append(self._menu_item(label=_("Autostart after login"),
-                                                 icon=select_icon,
-                                                 function=self.save_key,
-                                                 key='autostart',
-                                                 value=str(not str_bool(self.key_value('autostart')))
-                                                       .lower()))
-
-        item_settings.set_submenu(sub_menu_settings)
-        menu.append(item_settings)
-
-        # Stations
-        item_stations = Gtk.MenuItem.new_with_label(_('Stations'))
-        stations = self.get_stations()
-        if stations:
-            sub_menu_stations = Gtk.Menu()
-            for station in stations:
-                select_icon = ""
-                if station == self.key_value('station'):
-                    select_icon = MenuIcons.SELECT.value
-                sub_menu_stations.append(self._menu_item(label=station,
-                                                         icon=select_icon,
-                                                         function=self.switch_station,
-                                                         key='station',
-                                                         value=station))
-            item_stations.set_submenu(sub_menu_stations)
-        menu.append(item_stations)
-
-        # Now playing menu
-        item_now_playing = self._menu_item(label=_('Now playing'),
-                                           function=self.show_current)
-        menu.append(item_now_playing)
-
-        # Play and Stop menus
-        menu.append(Gtk.SeparatorMenuItem())
-        item_play = self._menu_item(label=_('Play'),
-                                            icon=MenuIcons.PLAY.value,
-                                            function=self.play_kink)
-        menu.append(item_play)
-        item_stop = self._menu_item(label=_('Stop'),
-                                            icon=MenuIcons.STOP.value,
-                                            function=self.stop_kink)
-        menu.append(item_stop)
-
-        # Quit menu
-        menu.append(Gtk.SeparatorMenuItem())
-        menu.append(self._menu_item(label=_('Quit'),
-                                    function=self.quit))
-
-        # Decide what can be used
-        item_now_playing.set_sensitive(True)
-        item_stations.set_sensitive(True)
-        item_play.set_sensitive(True)
-        item_stop.set_sensitive(True)
-        if not self._is_connected():
-            item_now_playing.set_sensitive(False)
-            item_stations.set_sensitive(False)
-            item_play.set_sensitive(False)
-            item_stop.set_sensitive(False)
-
-        if self.list_player.is_playing():
-            item_play.set_sensitive(False)
-        else:
-            item_stop.set_sensitive(False)
-
-        # Show the menu and return the menu object
-        menu.show_all()
-        return menu
+        stats = {f"playback_{name}": value for name, value in self.watchdog.stats().items()}
+        hours = (monotonic() - self.metrics.started) / 3600
+        stats['http_requests_per_hour'] = \
+            self.metrics.counters.get('http_requests_total', 0) / hours if hours else 0
+        return stats
 
     def show_current(self, widget=None):
         """ Show last played song. """
@@ -475,75 +812,93 @@ class KinkRadio():
         """ Show site in default browser """
         subprocess.call(['xdg-open', self.key_value('site')])
 
-    def show_log(self, widget=None):
-        """ Show site in default browser """
+    def show_log(self, key=None, value='all'):
+        """Export the play history and show it in the default application.
+
+        Args:
+            key (str, optional): menu key. Defaults to None.
+            value (str, optional): 'all', 'station' or 'today'. Defaults to 'all'.
+        """
+        if value == 'station':
+            self.history.export(self.playlist, station=self.key_value('station'))
+        elif value == 'today':
+            midnight = datetime.combine(date.today(), datetime.min.time())
+            self.history.export(self.playlist, since=midnight.timestamp())
+        else:
+            self.history.export(self.playlist)
         subprocess.call(['xdg-open', self.playlist])
 
     # ===============================================
     # General functions
     # ===============================================
 
+    def run(self):
+        """ Run the main loop until quit. """
+        self.loop.run()
+
     def quit(self, widget=None):
         """ Quit the application. """
         self.check_done_event.set()
+        self.scheduler.wake()
         self.stop_kink()
-        Notify.uninit()
-        Gtk.main_quit()
-
-    def read_ini(self, ini_path):
-        """ Read user settings.ini into dictionary. """
-        self.conf_parser.read(ini_path)
-        return dict(self.conf_parser.items('kink'))
-        #return {s:dict(self.conf_parser.items(s)) for
-        #        s in self.conf_parser.sections()}
+        self.worker.shutdown()
+        # The poll thread closes the history, the connections and the art cache
+        # after its last poll: do not wait for a download on the main loop
+        if not self.poll_thread:
+            self._close_backend()
+        self.settings.flush()
+        self.state.flush()
+        self.metrics.shutdown()
+        if self.mpris:
+            self.mpris.close()
+        if self.tray:
+            self.tray.close()
+        self.loop.quit()
 
     def key_value(self, key):
-        """Get key value from settings.ini and append to file if missing.
+        """Get key value from settings.ini and add the key if missing.
 
         Args:
             key (str): settings key.
-            create_missing (bool): create key with default value if missing
-            
+
         Returns:
             str: value of the key
         """
-        try:
-            value = self.kink_dict[key]
-        except KeyError:
-            # Get default value for missing key
-            value = self.kink_dict_default[key]
-
-            # Append key to settings.ini
-            with open(file=self.settings, mode='a', encoding='utf-8') as settings_ini:
-                settings_ini.write(f"\n{key} = {value}\n")
+        return self.settings.get(key)
 
-            # Reload the dictionary
-            self.kink_dict = self.read_ini(self.settings)
+    def toggle_key(self, key, value='true'):
+        """Switch a setting on or off.
 
-            # Rebuild the menu
-            self.indicator.set_menu(self._build_menu())
-        return value
+        Args:
+            key (str): settings key.
+            value (str, optional): value when switching on. Defaults to 'true'.
+        """
+        cur_value = self.key_value(key)
+        if str_bool(cur_value) or str_int(cur_value) > 0:
+            value = '0' if str(value).isdigit() else 'false'
+        self.save_key(key, value)
 
     def save_key(self, key, value):
-        ''' Save settings.ini '''
-        if 'kink' not in self.conf_parser.sections():
-            self.conf_parser.add_section('kink')
-
-        # Make sure value is a string
-        self.conf_parser.set('kink', key, str(value))
-
-        # Save the current config object to file
-        with open(file=self.settings, mode='w', encoding='utf-8') as settings_ini:
-            self.conf_parser.write(settings_ini)
+        """Save key value in settings.ini.
 
-        # Reload the dictionary
-        self.kink_dict = self.read_ini(self.settings)
+        Args:
+            key (str): settings key.
+            value (obj): new value
+        """
+        self.settings.set(key, value)
 
-        # Rebuild the menu
-        self.indicator.set_menu(self._build_menu())
+    def _settings_changed(self, keys):
+        """Update what depends on the changed settings.
 
-        # Check if autostart is set
-        self.check_autostart()
+        Args:
+            keys (set): changed settings keys
+        """
+        if keys & MENU_KEYS:
+            self.update_menu()
+        if 'autostart' in keys:
+            self.check_autostart()
+        if 'profile' in keys:
+            self._apply_profile()
 
     def check_autostart(self):
         """ Check if configured for autostart """
@@ -555,15 +910,32 @@ class KinkRadio():
             if exists(autostart):
                 os.remove(autostart)
 
-    def show_notification(self, summary, body=None, thumb=None):
+    def show_notification(self, summary, body=None, thumb=None, key='notification'):
+        """Show the notification on the main loop.
+
+        Args:
+            summary (str): notification summary.
+            body (str, optional): notification body text. Defaults to None.
+            thumb (str, optional): icon path. Defaults to None.
+            key (str, optional): notification category: one notification per category
+                                 is updated in place. Defaults to 'notification'.
+        """
+        self.dispatcher.post(key, self._show_notification, summary, body, thumb, key)
+
+    def _show_notification(self, summary, body=None, thumb=None, key='notification'):
         """Show the notification.
 
         Args:
             summary (str): notification summary.
             body (str, optional): notification body text. Defaults to None.
             thumb (str, optional): icon path. Defaults to None.
+            key (str, optional): notification category. Defaults to 'notification'.
         """
-        notification = Notify.Notification.new(summary, body, thumb)
-        notification.set_timeout(str_int(self.key_value('notification_timeout')) * 1000)
-        notification.set_urgency(Notify.Urgency.LOW)
-        notification.show()
+        if not self.tray:
+            return
+        with self.metrics.timer('notification_seconds'):
+            self.tray.notify(summary=summary,
+                             body=body,
+                             thumb=thumb,
+                             timeout=str_int(self.key_value('notification_timeout')),
+                             key=key)
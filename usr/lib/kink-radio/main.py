@@ -3,22 +3,28 @@
 """ Initialize KinkRadio class """
 # -OO: Turn on basic optimizations.  Given twice, causes docstrings to be discarded.
 
+from time import monotonic
+# Startup time includes loading the modules
+STARTED = monotonic()
+
 import sys
-#import signal
+import signal
+import argparse
 import traceback
 import gettext
 from kink import KinkRadio
-from dialogs import error_dialog
 
 import gi
-gi.require_version('Gtk', '3.0')
-from gi.repository import Gtk
+gi.require_version('GLib', '2.0')
+from gi.repository import GLib
 
 _ = gettext.translation('kink-radio', fallback=True).gettext
 
 def uncaught_excepthook(*args):
     sys.__excepthook__(*args)
     if not __debug__:
+        # Only load GTK to show the error in the tray front end
+        from dialogs import error_dialog
         details = '\n'.join(traceback.format_exception(*args)).replace('<', '').replace('>', '')
         title = _('Unexpected error')
         msg = _('Kink Radio has failed with the following unexpected error.' \
@@ -27,13 +33,27 @@ def uncaught_excepthook(*args):
 
     sys.exit(1)
 
-sys.excepthook = uncaught_excepthook
-
 def main():
     """Main function initiating KinkRadio class"""
-    KinkRadio()
-    #signal.signal(signal.SIGINT, signal.SIG_DFL)
-    Gtk.main()
+    parser = argparse.ArgumentParser(description=_('System tray app for KINK radio'))
+    parser.add_argument('--daemon', action='store_true',
+                        help=_('run without tray icon and notifications, '
+                               'control the radio with MPRIS over D-Bus'))
+    # Handled by the launcher
+    parser.add_argument('-d', '--debug', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if not args.daemon:
+        sys.excepthook = uncaught_excepthook
+
+    kink = KinkRadio(headless=args.daemon, started=STARTED)
+    # Stop playing and save settings and history when asked to stop
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signum, kink.quit)
+    kink.run()
+    # Setting up network or VLC failed: report it like any uncaught error
+    if kink.error:
+        raise kink.error
 
 if __name__ == '__main__':
     main()
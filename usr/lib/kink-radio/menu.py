@@ -0,0 +1,251 @@
+#! /usr/bin/env python3
+
+"""Persistent system tray menu.
+
+    The menu is built once. Check icons, sensitivity and the station list
+    are updated in place instead of rebuilding all widgets.
+"""
+
+import gettext
+from enum import Enum
+from os.path import exists
+from utils import str_int, str_bool
+from profiles import profile_names
+
+import gi
+gi.require_version('Gtk', '3.0')
+from gi.repository import Gtk
+
+_ = gettext.translation('kink-radio', fallback=True).gettext
+
+# Maximum length of a station label with its current track
+MAX_LABEL = 60
+
+
+class MenuIcons(Enum):
+    """ Enum with icon names or paths """
+    PLAY = 'media-playback-start'
+    STOP = 'media-playback-stop'
+    SELECT = 'dialog-ok-apply'
+
+
+class TrayMenu():
+    """ Indicator menu that is updated in place. """
+    def __init__(self, kink, title):
+        self.kink = kink
+        # Current icon of each Gtk.Image: only changed icons are set
+        self.icons = {}
+        # Station name: Gtk.Image with the check icon and Gtk.Label
+        self.station_images = {}
+        self.station_labels = {}
+        self.stations = None
+        # Profile name: Gtk.Image with the check icon
+        self.profile_images = {}
+
+        self.menu = Gtk.Menu()
+
+        # Kink menu
+        item_kink = Gtk.MenuItem.new_with_label(title)
+        sub_menu_kink = Gtk.Menu()
+        site = self.kink.key_value('site')
+        sub_menu_kink.append(self._menu_item(label=site[site.rfind('/') + 1:],
+                                             function=self.kink.show_site)[0])
+        item_playlist = Gtk.MenuItem.new_with_label(_('Playlist'))
+        sub_menu_playlist = Gtk.Menu()
+        for label, value in ((_('All stations'), 'all'),
+                             (_('Current station'), 'station'),
+                             (_('Today'), 'today')):
+            sub_menu_playlist.append(self._menu_item(label=label,
+                                                     function=self.kink.show_log,
+                                                     key='playlist',
+                                                     value=value)[0])
+        item_playlist.set_submenu(sub_menu_playlist)
+        sub_menu_kink.append(item_playlist)
+        item_kink.set_submenu(sub_menu_kink)
+        self.menu.append(item_kink)
+
+        # Settings
+        self.menu.append(Gtk.SeparatorMenuItem())
+        item_settings = Gtk.MenuItem.new_with_label(_('Settings'))
+        sub_menu_settings = Gtk.Menu()
+        item, self.img_notification, _label = self._menu_item(label=_("Show what's playing"),
+                                                      function=self.kink.toggle_key,
+                                                      key='notification_timeout',
+                                                      value=10)
+        sub_menu_settings.append(item)
+        item, self.img_autoplay, _label = self._menu_item(label=_("Autoplay when starting"),
+                                                  function=self.kink.toggle_key,
+                                                  key='autoplay',
+                                                  value='true')
+        sub_menu_settings.append(item)
+        item, self.img_autostart, _label = self._menu_item(label=_("Autostart after login"),
+                                                   function=self.kink.toggle_key,
+                                                   key='autostart',
+                                                   value='true')
+        sub_menu_settings.append(item)
+        item, self.img_watch_all, _label = self._menu_item(label=_("Follow all stations"),
+                                                           function=self.kink.toggle_key,
+                                                           key='watch_all',
+                                                           value='true')
+        sub_menu_settings.append(item)
+
+        # Playback profiles
+        item_profiles = Gtk.MenuItem.new_with_label(_('Playback profile'))
+        sub_menu_profiles = Gtk.Menu()
+        for profile in profile_names(self.kink.settings.keys()):
+            item, self.profile_images[profile], _label = self._menu_item(label=profile,
+                                                                        function=self.kink.save_key,
+                                                                        key='profile',
+                                                                        value=profile)
+            sub_menu_profiles.append(item)
+        item_profiles.set_submenu(sub_menu_profiles)
+        sub_menu_settings.append(item_profiles)
+        item_settings.set_submenu(sub_menu_settings)
+        self.menu.append(item_settings)
+
+        # Stations: the sub menu is filled when the station list is known
+        self.item_stations = Gtk.MenuItem.new_with_label(_('Stations'))
+        self.menu.append(self.item_stations)
+
+        # Now playing menu
+        self.item_now_playing = self._menu_item(label=_('Now playing'),
+                                                function=self.kink.show_current)[0]
+        self.menu.append(self.item_now_playing)
+
+        # Play and Stop menus
+        self.menu.append(Gtk.SeparatorMenuItem())
+        self.item_play = self._menu_item(label=_('Play'),
+                                         icon=MenuIcons.PLAY.value,
+                                         function=self.kink.play_kink)[0]
+        self.menu.append(self.item_play)
+        self.item_stop = self._menu_item(label=_('Stop'),
+                                         icon=MenuIcons.STOP.value,
+                                         function=self.kink.stop_kink)[0]
+        self.menu.append(self.item_stop)
+
+        # Quit menu
+        self.menu.append(Gtk.SeparatorMenuItem())
+        self.menu.append(self._menu_item(label=_('Quit'),
+                                         function=self.kink.quit)[0])
+
+        self.menu.show_all()
+        self.update()
+
+    def _set_icon(self, image, icon):
+        """Set the icon of a Gtk.Image when it changed.
+
+        Args:
+            image (Gtk.Image): image in a menu item
+            icon (str): icon name/path or empty string to clear the image
+        """
+        if self.icons.get(image) == icon:
+            return
+        self.icons[image] = icon
+        if not icon:
+            image.clear()
+        elif exists(icon):
+            image.set_from_file(icon)
+        else:
+            image.set_from_icon_name(icon, Gtk.IconSize.MENU)
+
+    def _menu_item(self, label="", icon=None, function=None, key=None, value=None):
+        """Create MenuItem with given arguments
+
+        Args:
+            label (str, optional): label. Defaults to "".
+            icon (str, optional): icon name/path. Defaults to None.
+            function (obj, optional): function to call when clicked. Defaults to None.
+            key (str, optional): first function argument. Defaults to None.
+            value (str, optional): second function argument. Defaults to None.
+
+        Returns:
+            tuple: Gtk.MenuItem for Gtk.Menu, its Gtk.Image and Gtk.Label
+        """
+        item = Gtk.MenuItem.new()
+        item_box = Gtk.Box.new(Gtk.Orientation.HORIZONTAL, 6)
+
+        # Always add an image so that the icon can be changed later
+        image = Gtk.Image.new()
+        self._set_icon(image, icon or '')
+        item_box.pack_start(image, False, False, 0)
+        label_widget = Gtk.Label.new(label)
+        item_box.pack_start(label_widget, False, False, 0)
+
+        item.add(item_box)
+
+        if function and key:
+            item.connect('activate', lambda * a: function(key, value))
+        elif function:
+            item.connect('activate', lambda * a: function())
+        return item, image, label_widget
+
+    def _set_stations(self, stations):
+        """Replace the station sub menu.
+
+        Args:
+            stations (list): list with available KINK stations
+        """
+        self.stations = list(stations)
+        for image in self.station_images.values():
+            self.icons.pop(image, None)
+        self.station_images = {}
+        self.station_labels = {}
+        self.item_stations.set_submenu(None)
+        if not stations:
+            return
+        sub_menu_stations = Gtk.Menu()
+        for station in stations:
+            item, image, label = self._menu_item(label=station,
+                                                 function=self.kink.switch_station,
+                                                 key='station',
+                                                 value=station)
+            self.station_images[station] = image
+            self.station_labels[station] = label
+            sub_menu_stations.append(item)
+        sub_menu_stations.show_all()
+        self.item_stations.set_submenu(sub_menu_stations)
+
+    def update(self):
+        """ Update check icons, station list and sensitivity in place. """
+        select = MenuIcons.SELECT.value
+
+        # Settings
+        self._set_icon(self.img_notification,
+                       select if str_int(self.kink.key_value('notification_timeout')) > 0 else '')
+        self._set_icon(self.img_autoplay,
+                       select if str_bool(self.kink.key_value('autoplay')) else '')
+        self._set_icon(self.img_autostart,
+                       select if str_bool(self.kink.key_value('autostart')) else '')
+        self._set_icon(self.img_watch_all,
+                       select if str_bool(self.kink.key_value('watch_all')) else '')
+
+        cur_profile = self.kink.key_value('profile')
+        for profile, image in self.profile_images.items():
+            self._set_icon(image, select if profile == cur_profile else '')
+
+        # Stations: only rebuild the sub menu when the list changed
+        if self.stations != self.kink.stations:
+            self._set_stations(self.kink.stations)
+        cur_station = self.kink.key_value('station')
+        for station, image in self.station_images.items():
+            self._set_icon(image, select if station == cur_station else '')
+
+        # Show what's playing on each station when following all stations
+        for station, label in self.station_labels.items():
+            text = station
+            track = self.kink.station_tracks.get(station)
+            if track and (track.artist or track.title):
+                text = f"{station}: {track.artist} - {track.title}"
+                if len(text) > MAX_LABEL:
+                    text = text[:MAX_LABEL - 1] + '…'
+            if label.get_text() != text:
+                label.set_text(text)
+
+        # Decide what can be used
+        connected = self.kink.is_connected()
+        playing = self.kink.is_playing() or (not self.kink.ready and self.kink.play_when_ready)
+        # The last known track and stations can be used while offline
+        self.item_now_playing.set_sensitive(connected or bool(self.kink.cur_playing.title))
+        self.item_stations.set_sensitive(connected or bool(self.kink.stations))
+        self.item_play.set_sensitive(connected and not playing)
+        self.item_stop.set_sensitive(connected and playing)
@@ -0,0 +1,193 @@
+#! /usr/bin/env python3
+
+"""Metrics of polling, downloads, the menu and playback.
+
+    Counters, gauges and timing histograms are kept in memory and exported
+    in the Prometheus text format: served on a local port and/or written to
+    a stats file at an interval. When metrics are disabled, every call
+    returns immediately.
+"""
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock, Thread
+from time import monotonic
+from utils import atomic_write
+
+# Prefix of all metric names
+PREFIX = 'kink_radio_'
+# Upper bounds in seconds of the timing histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Metrics():
+    """ In-memory counters, gauges and timing histograms. """
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started = monotonic()
+        self.counters = {}
+        self.gauges = {}
+        # Name: [bucket counts, sum, count]
+        self.histograms = {}
+        # Functions returning a dict of gauges, called on export
+        self.collectors = []
+        self.lock = Lock()
+        self.server = None
+
+    def inc(self, name, value=1):
+        """Increase a counter.
+
+        Args:
+            name (str): counter name
+            value (int, optional): increment. Defaults to 1.
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name, value):
+        """Set a gauge.
+
+        Args:
+            name (str): gauge name
+            value (float): current value
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            self.gauges[name] = value
+
+    def observe(self, name, seconds):
+        """Add a duration to a timing histogram.
+
+        Args:
+            name (str): histogram name
+            seconds (float): duration
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.setdefault(name, [[0] * len(BUCKETS), 0.0, 0])
+            index = bisect_left(BUCKETS, seconds)
+            if index < len(BUCKETS):
+                histogram[0][index] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    @contextmanager
+    def timer(self, name):
+        """Time a block of code, e.g.: with metrics.timer('menu_update_seconds'):
+
+        Args:
+            name (str): histogram name
+        """
+        if not self.enabled:
+            yield
+            return
+        start = monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, monotonic() - start)
+
+    def add_collector(self, collector):
+        """Add gauges that are read on export, e.g. the playback statistics.
+
+        Args:
+            collector (obj): function returning a dict with gauge name and value
+        """
+        self.collectors.append(collector)
+
+    def render(self):
+        """Get all metrics in the Prometheus text format.
+
+        Returns:
+            str: metrics text
+        """
+        gauges = {'uptime_seconds': monotonic() - self.started}
+        for collector in self.collectors:
+            gauges.update({name: value for name, value in collector().items()
+                           if value is not None})
+
+        lines = []
+        with self.lock:
+            gauges.update(self.gauges)
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE {PREFIX}{name} counter")
+                lines.append(f"{PREFIX}{name} {value}")
+            for name, value in sorted(gauges.items()):
+                lines.append(f"# TYPE {PREFIX}{name} gauge")
+                lines.append(f"{PREFIX}{name} {value:g}")
+            for name, (counts, total, count) in sorted(self.histograms.items()):
+                lines.append(f"# TYPE {PREFIX}{name} histogram")
+                cumulative = 0
+                for bound, bucket in zip(BUCKETS, counts):
+                    cumulative += bucket
+                    lines.append(f'{PREFIX}{name}_bucket{{le="{bound}"}} {cumulative}')
+                lines.append(f'{PREFIX}{name}_bucket{{le="+Inf"}} {count}')
+                lines.append(f"{PREFIX}{name}_sum {total:.6f}")
+                lines.append(f"{PREFIX}{name}_count {count}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Write the metrics to a stats file.
+
+        Args:
+            path (str): path of the stats file
+
+        Returns:
+            bool: True to keep a periodic write running
+        """
+        if not self.enabled:
+            return False
+        try:
+            atomic_write(path, self.render())
+        except OSError as err:
+            print((f"Metrics: {err}"))
+        return True
+
+    def serve(self, port):
+        """Serve the metrics on http://127.0.0.1:port/metrics.
+
+        Args:
+            port (int): local port
+        """
+        if not self.enabled or self.server:
+            return
+        # Only load the HTTP server when the metrics are served
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """ Answer metrics requests. """
+            def do_GET(self):
+                """ Send the metrics text. """
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                """ Do not log every request. """
+
+        try:
+            self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        except OSError as err:
+            print((f"Metrics: cannot serve on port {port}: {err}"))
+            return
+        self.server.daemon_threads = True
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        print((f"Metrics: http://127.0.0.1:{port}/metrics"))
+
+    def shutdown(self):
+        """ Stop serving metrics. """
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
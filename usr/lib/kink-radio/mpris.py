@@ -0,0 +1,272 @@
+#! /usr/bin/env python3
+
+"""MPRIS2 D-Bus interface.
+
+    Desktop media keys, sound menus and remote tools (e.g. playerctl) can
+    play and stop the radio, read what's playing and switch stations: Next
+    and Previous cycle through the stations, and the nl.kink.Radio interface
+    selects a station by name. Live radio cannot pause or seek: Pause stops.
+    References: https://specifications.freedesktop.org/mpris-spec/latest/
+"""
+
+import gi
+gi.require_version('Gio', '2.0')
+from gi.repository import Gio, GLib
+
+BUS_NAME = 'org.mpris.MediaPlayer2.kink_radio'
+OBJECT_PATH = '/org/mpris/MediaPlayer2'
+ROOT_IFACE = 'org.mpris.MediaPlayer2'
+PLAYER_IFACE = 'org.mpris.MediaPlayer2.Player'
+RADIO_IFACE = 'nl.kink.Radio'
+NO_TRACK = '/org/mpris/MediaPlayer2/TrackList/NoTrack'
+
+INTROSPECTION = """
+<node>
+  <interface name="org.mpris.MediaPlayer2">
+    <method name="Raise"/>
+    <method name="Quit"/>
+    <property name="CanQuit" type="b" access="read"/>
+    <property name="CanRaise" type="b" access="read"/>
+    <property name="HasTrackList" type="b" access="read"/>
+    <property name="Identity" type="s" access="read"/>
+    <property name="DesktopEntry" type="s" access="read"/>
+    <property name="SupportedUriSchemes" type="as" access="read"/>
+    <property name="SupportedMimeTypes" type="as" access="read"/>
+  </interface>
+  <interface name="org.mpris.MediaPlayer2.Player">
+    <method name="Next"/>
+    <method name="Previous"/>
+    <method name="Pause"/>
+    <method name="PlayPause"/>
+    <method name="Stop"/>
+    <method name="Play"/>
+    <method name="Seek">
+      <arg direction="in" name="Offset" type="x"/>
+    </method>
+    <method name="SetPosition">
+      <arg direction="in" name="TrackId" type="o"/>
+      <arg direction="in" name="Position" type="x"/>
+    </method>
+    <method name="OpenUri">
+      <arg direction="in" name="Uri" type="s"/>
+    </method>
+    <signal name="Seeked">
+      <arg name="Position" type="x"/>
+    </signal>
+    <property name="PlaybackStatus" type="s" access="read"/>
+    <property name="Rate" type="d" access="readwrite"/>
+    <property name="Metadata" type="a{sv}" access="read"/>
+    <property name="Volume" type="d" access="readwrite"/>
+    <property name="Position" type="x" access="read"/>
+    <property name="MinimumRate" type="d" access="read"/>
+    <property name="MaximumRate" type="d" access="read"/>
+    <property name="CanGoNext" type="b" access="read"/>
+    <property name="CanGoPrevious" type="b" access="read"/>
+    <property name="CanPlay" type="b" access="read"/>
+    <property name="CanPause" type="b" access="read"/>
+    <property name="CanSeek" type="b" access="read"/>
+    <property name="CanControl" type="b" access="read"/>
+  </interface>
+  <interface name="nl.kink.Radio">
+    <method name="SwitchStation">
+      <arg direction="in" name="Station" type="s"/>
+    </method>
+    <property name="Station" type="s" access="readwrite"/>
+    <property name="Stations" type="as" access="read"/>
+  </interface>
+</node>
+"""
+
+# D-Bus types of the properties
+TYPES = {'CanQuit': 'b', 'CanRaise': 'b', 'HasTrackList': 'b', 'Identity': 's',
+         'DesktopEntry': 's', 'SupportedUriSchemes': 'as', 'SupportedMimeTypes': 'as',
+         'PlaybackStatus': 's', 'Rate': 'd', 'Metadata': 'a{sv}', 'Volume': 'd',
+         'Position': 'x', 'MinimumRate': 'd', 'MaximumRate': 'd', 'CanGoNext': 'b',
+         'CanGoPrevious': 'b', 'CanPlay': 'b', 'CanPause': 'b', 'CanSeek': 'b',
+         'CanControl': 'b', 'Station': 's', 'Stations': 'as'}
+# Properties that change while running
+CHANGING = {PLAYER_IFACE: ('PlaybackStatus', 'Metadata', 'Volume', 'CanGoNext', 'CanGoPrevious'),
+            RADIO_IFACE: ('Station', 'Stations')}
+
+
+class Mpris():
+    """ MPRIS2 media player on the session bus. """
+    def __init__(self, kink, identity, desktop_entry):
+        self.kink = kink
+        self.identity = identity
+        self.desktop_entry = desktop_entry
+        self.connection = None
+        self.registrations = []
+        # Last published values of the changing properties
+        self.published = {}
+        self.track_nr = 0
+        self.track_key = None
+        self.node = Gio.DBusNodeInfo.new_for_xml(INTROSPECTION)
+        self.owner_id = Gio.bus_own_name(Gio.BusType.SESSION,
+                                         BUS_NAME,
+                                         Gio.BusNameOwnerFlags.NONE,
+                                         self._bus_acquired,
+                                         None,
+                                         self._name_lost)
+
+    def _bus_acquired(self, connection, name):
+        """ Publish the player object on the bus. """
+        self.connection = connection
+        for interface in self.node.interfaces:
+            self.registrations.append(connection.register_object(OBJECT_PATH,
+                                                                 interface,
+                                                                 self._method_call,
+                                                                 self._get_property,
+                                                                 self._set_property))
+
+    def _name_lost(self, connection, name):
+        """ Another player owns the name or there is no session bus. """
+        print((f"MPRIS: cannot own {name} on the session bus"))
+
+    def _method_call(self, connection, sender, object_path, interface_name,
+                     method_name, parameters, invocation):
+        """ Handle a method call on the main loop. """
+        kink = self.kink
+        if method_name == 'Quit':
+            invocation.return_value(None)
+            kink.quit()
+            return
+        if method_name in ('Play', 'OpenUri'):
+            kink.play_kink()
+        elif method_name in ('Pause', 'Stop'):
+            kink.stop_kink()
+        elif method_name == 'PlayPause':
+            if kink.is_playing():
+                kink.stop_kink()
+            else:
+                kink.play_kink()
+        elif method_name in ('Next', 'Previous'):
+            self._step_station(1 if method_name == 'Next' else -1)
+        elif method_name == 'SwitchStation':
+            station = parameters.unpack()[0]
+            if station not in kink.stations:
+                invocation.return_dbus_error('org.freedesktop.DBus.Error.InvalidArgs',
+                                             f"Unknown station: {station}")
+                return
+            kink.switch_station('station', station)
+        # Raise, Seek and SetPosition: not supported by live radio
+        invocation.return_value(None)
+
+    def _step_station(self, step):
+        """Switch to the next or previous station.
+
+        Args:
+            step (int): 1 for the next, -1 for the previous station
+        """
+        stations = self.kink.stations
+        if not stations:
+            return
+        station = self.kink.key_value('station')
+        index = stations.index(station) if station in stations else -step
+        self.kink.switch_station('station', stations[(index + step) % len(stations)])
+
+    def _values(self):
+        """Get the values of all properties.
+
+        Returns:
+            dict: property name and python value
+        """
+        kink = self.kink
+        playing = kink.is_playing()
+        can_switch = len(kink.stations) > 1
+        volume = kink.list_player.get_media_player().audio_get_volume()
+        return {'CanQuit': True,
+                'CanRaise': False,
+                'HasTrackList': False,
+                'Identity': self.identity,
+                'DesktopEntry': self.desktop_entry,
+                'SupportedUriSchemes': [],
+                'SupportedMimeTypes': [],
+                'PlaybackStatus': 'Playing' if playing else 'Stopped',
+                'Rate': 1.0,
+                'Metadata': self._metadata(),
+                'Volume': max(volume, 0) / 100,
+                'Position': 0,
+                'MinimumRate': 1.0,
+                'MaximumRate': 1.0,
+                'CanGoNext': can_switch,
+                'CanGoPrevious': can_switch,
+                'CanPlay': True,
+                'CanPause': True,
+                'CanSeek': False,
+                'CanControl': True,
+                'Station': kink.key_value('station'),
+                'Stations': list(kink.stations)}
+
+    def _metadata(self):
+        """Get the metadata of the current track.
+
+        Returns:
+            dict: metadata with GLib.Variant values
+        """
+        track = self.kink.cur_playing
+        if not (track.artist or track.title):
+            return {'mpris:trackid': GLib.Variant('o', NO_TRACK)}
+        # A new track id for every track
+        if track.key() != self.track_key:
+            self.track_key = track.key()
+            self.track_nr += 1
+        metadata = {'mpris:trackid': GLib.Variant('o', f"{OBJECT_PATH}/track/{self.track_nr}"),
+                    'xesam:title': GLib.Variant('s', track.title),
+                    'xesam:artist': GLib.Variant('as', [track.artist]),
+                    'xesam:album': GLib.Variant('s', track.program or track.station)}
+        if self.kink.thumb:
+            metadata['mpris:artUrl'] = GLib.Variant('s', f"file://{self.kink.thumb}")
+        elif track.album_art:
+            metadata['mpris:artUrl'] = GLib.Variant('s', track.album_art)
+        if track.timing:
+            metadata['mpris:length'] = GLib.Variant('x', int(track.timing[1] * 1000000))
+        return metadata
+
+    def _get_property(self, connection, sender, object_path, interface_name, property_name):
+        """ Get a property as GLib.Variant. """
+        value = self._values()[property_name]
+        if property_name == 'Metadata':
+            return GLib.Variant('a{sv}', value)
+        return GLib.Variant(TYPES[property_name], value)
+
+    def _set_property(self, connection, sender, object_path, interface_name,
+                      property_name, value):
+        """ Change the volume or the station. """
+        if property_name == 'Volume':
+            volume = min(max(value.unpack(), 0), 1)
+            self.kink.list_player.get_media_player().audio_set_volume(int(volume * 100))
+        elif property_name == 'Station' and value.unpack() in self.kink.stations:
+            self.kink.switch_station('station', value.unpack())
+        self.update()
+        return True
+
+    def update(self):
+        """ Emit PropertiesChanged for the properties that changed. """
+        if not self.connection:
+            return
+        values = self._values()
+        for interface, names in CHANGING.items():
+            changed = {}
+            for name in names:
+                if name == 'Metadata':
+                    variant = GLib.Variant('a{sv}', values[name])
+                else:
+                    variant = GLib.Variant(TYPES[name], values[name])
+                if self.published.get(name) != variant:
+                    self.published[name] = variant
+                    changed[name] = variant
+            if changed:
+                self.connection.emit_signal(None,
+                                            OBJECT_PATH,
+                                            'org.freedesktop.DBus.Properties',
+                                            'PropertiesChanged',
+                                            GLib.Variant('(sa{sv}as)', (interface, changed, [])))
+
+    def close(self):
+        """ Remove the player from the bus. """
+        if self.connection:
+            for registration in self.registrations:
+                self.connection.unregister_object(registration)
+        self.registrations = []
+        Gio.bus_unown_name(self.owner_id)
@@ -0,0 +1,94 @@
+#! /usr/bin/env python3
+
+"""Shared HTTP client for all network I/O.
+
+    One requests session keeps connections to api.kink.nl and the album-art
+    CDN alive between polls. Failed requests are retried a limited number of
+    times with exponential backoff and random jitter. Quick checks, e.g. if a
+    stream answers, use a second session without retries.
+"""
+
+from random import uniform
+from time import monotonic
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Retry when the server is overloaded or temporarily unavailable
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class JitterRetry(Retry):
+    """ Retry with exponential backoff and random ("full") jitter. """
+    def get_backoff_time(self):
+        """Randomize the backoff so that clients do not retry in lockstep.
+
+        Returns:
+            float: seconds to sleep before the next retry
+        """
+        backoff = super().get_backoff_time()
+        if backoff <= 0:
+            return 0
+        return uniform(0, backoff)
+
+
+class HttpClient():
+    """ Pooled keep-alive HTTP session with bounded retries. """
+    def __init__(self, timeout=10, retries=3, backoff=0.5, pool_size=4, metrics=None):
+        self.timeout = timeout
+        self.metrics = metrics
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': 'kink-radio',
+                                     'Accept-Encoding': 'gzip, deflate'})
+
+        retry = JitterRetry(total=retries,
+                            backoff_factor=backoff,
+                            status_forcelist=RETRY_STATUS,
+                            allowed_methods=frozenset(['GET', 'HEAD']),
+                            raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size,
+                              max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        # Checks fail fast: no retries
+        self.check_session = requests.Session()
+        self.check_session.headers.update({'User-Agent': 'kink-radio'})
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size,
+                              max_retries=0)
+        self.check_session.mount('https://', adapter)
+        self.check_session.mount('http://', adapter)
+
+    def get(self, url, retry=True, **kwargs):
+        """GET url with the session's pooled connections.
+
+        Args:
+            url (str): url to download
+            retry (bool, optional): retry when the request failed. Defaults to True.
+            kwargs: keyword arguments passed to requests
+
+        Returns:
+            requests.Response: server response
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        session = self.session if retry else self.check_session
+        if not self.metrics or not self.metrics.enabled:
+            return session.get(url, **kwargs)
+
+        self.metrics.inc('http_requests_total')
+        start = monotonic()
+        try:
+            return session.get(url, **kwargs)
+        except requests.RequestException:
+            self.metrics.inc('http_errors_total')
+            raise
+        finally:
+            self.metrics.observe('http_request_seconds', monotonic() - start)
+
+    def close(self):
+        """ Close all pooled connections. """
+        self.session.close()
+        self.check_session.close()
@@ -0,0 +1,114 @@
+#! /usr/bin/env python3
+
+"""Notification manager.
+
+    Each category (now playing, connection, watched artists) has one
+    notification that is updated in place instead of stacking new bubbles.
+    A category shows at most one notification per interval: a burst, e.g.
+    metadata corrections right after a track change, is coalesced into its
+    last notification. Unchanged notifications that are still visible are
+    not sent again. Album art is passed as a file path from the cache, so
+    the notification daemon loads it, not the main loop.
+"""
+
+from time import monotonic
+
+import gi
+gi.require_version('Notify', '0.7')
+from gi.repository import GLib, Notify
+
+
+class Notifier():
+    """ Persistent, rate limited notifications by category. """
+    def __init__(self, min_interval=2.0):
+        self.min_interval = min_interval
+        # Category: Notify.Notification
+        self.notifications = {}
+        # Category: (time shown, (summary, body, thumb)) while visible
+        self.shown = {}
+        # Category: latest (summary, body, thumb, timeout) waiting for the interval
+        self.pending = {}
+        # Category: GLib source id of the delayed show
+        self.timers = {}
+
+    def show(self, key, summary, body=None, thumb=None, timeout=10):
+        """Show or update the notification of a category.
+
+        Args:
+            key (str): category
+            summary (str): notification summary.
+            body (str, optional): notification body text. Defaults to None.
+            thumb (str, optional): icon name or path. Defaults to None.
+            timeout (int, optional): seconds to show the notification. Defaults to 10.
+        """
+        last = self.shown.get(key)
+        if last and last[1] == (summary, body, thumb) and \
+           monotonic() - last[0] < timeout and key not in self.pending:
+            # Still showing the same
+            return
+        self.pending[key] = (summary, body, thumb, timeout)
+        if key in self.timers:
+            # The latest notification is shown when the interval ends
+            return
+        wait = self.min_interval - (monotonic() - last[0]) if last else 0
+        if wait > 0:
+            self.timers[key] = GLib.timeout_add(int(wait * 1000), self._show_pending, key)
+        else:
+            self._show_pending(key)
+
+    def _show_pending(self, key):
+        """Show the latest notification of a category.
+
+        Args:
+            key (str): category
+
+        Returns:
+            bool: False to remove the timeout source
+        """
+        self.timers.pop(key, None)
+        entry = self.pending.pop(key, None)
+        if not entry:
+            return False
+        summary, body, thumb, timeout = entry
+
+        notification = self.notifications.get(key)
+        if notification:
+            notification.update(summary, body, thumb)
+        else:
+            notification = Notify.Notification.new(summary, body, thumb)
+            notification.set_urgency(Notify.Urgency.LOW)
+            notification.connect('closed', self._closed, key)
+            self.notifications[key] = notification
+        notification.set_timeout(timeout * 1000)
+        try:
+            notification.show()
+        except GLib.Error as err:
+            print((f"Notification: {err}"))
+            return False
+        self.shown[key] = (monotonic(), (summary, body, thumb))
+        return False
+
+    def _closed(self, notification, key):
+        """ The notification expired or was dismissed: show it again when asked. """
+        self.shown.pop(key, None)
+
+    def close(self, key):
+        """Remove the notification of a category, e.g. a connection error.
+
+        Args:
+            key (str): category
+        """
+        timer = self.timers.pop(key, None)
+        if timer:
+            GLib.source_remove(timer)
+        self.pending.pop(key, None)
+        if self.shown.pop(key, None):
+            try:
+                self.notifications[key].close()
+            except GLib.Error:
+                pass
+
+    def close_all(self):
+        """ Remove all notifications. """
+        for key in list(self.notifications):
+            self.close(key)
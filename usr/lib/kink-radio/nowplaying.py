@@ -0,0 +1,143 @@
+#! /usr/bin/env python3
+
+"""Shared snapshot of the KINK now-playing feed.
+
+    The feed contains the data of all KINK stations. One download is shared
+    between the connection check, the station list and the track information.
+    Downloads are conditional (ETag / Last-Modified): when KINK answers with
+    304 Not Modified the previous snapshot is kept without parsing anything.
+"""
+
+import re
+import json
+from threading import Lock
+from time import monotonic
+
+import requests
+
+MAX_AGE_RE = re.compile(r'max-age\s*=\s*(\d+)')
+
+
+class NowPlaying():
+    """ Download now-playing.json at most once per freshness window. """
+    def __init__(self, http, url, max_age=5):
+        self.http = http
+        self.url = url
+        self.max_age = max_age
+        self.obj = None
+        self.fetched = None
+        # Incremented each time new data was parsed
+        self.version = 0
+        # Validators and Cache-Control expiry sent by the server
+        self.etag = None
+        self.last_modified = None
+        self.expires = None
+        self.lock = Lock()
+
+    def is_fresh(self):
+        """Check if the snapshot is still within the freshness window.
+
+        Returns:
+            bool: snapshot can be used without downloading it again
+        """
+        if self.fetched is None:
+            return False
+        now = monotonic()
+        if self.expires is not None and now < self.expires:
+            return True
+        return now - self.fetched < self.max_age
+
+    def expires_in(self):
+        """Get the seconds until the server's Cache-Control max-age expires.
+
+        Returns:
+            float: seconds until the snapshot expires, 0 when unknown
+        """
+        if self.expires is None:
+            return 0
+        return max(self.expires - monotonic(), 0)
+
+    def cached(self):
+        """Get the last downloaded snapshot without touching the network.
+
+        Returns:
+            dict: now playing data from KINK or None
+        """
+        return self.obj
+
+    def get(self, force=False):
+        """Get the parsed feed and download it when the snapshot is stale.
+
+        Args:
+            force (bool, optional): ignore the freshness window. Defaults to False.
+
+        Returns:
+            dict: now playing data from KINK or None when KINK is unreachable
+        """
+        with self.lock:
+            if force or not self.is_fresh():
+                self._fetch()
+                self.fetched = monotonic()
+            return self.obj
+
+    def _fetch(self):
+        """ Conditionally download and parse now-playing.json. """
+        headers = {}
+        if self.obj is not None:
+            if self.etag:
+                headers['If-None-Match'] = self.etag
+            if self.last_modified:
+                headers['If-Modified-Since'] = self.last_modified
+
+        try:
+            res = self.http.get(self.url, headers=headers)
+        except requests.RequestException as err:
+            print((f"Now playing: {err}"))
+            self._reset()
+            return
+
+        if res.status_code == 304:
+            # Nothing changed: keep the current snapshot
+            self._save_expiry(res.headers)
+            return
+
+        obj = None
+        if res.status_code == 200:
+            try:
+                obj = json.loads(res.text)
+            except ValueError:
+                pass
+        if obj is None:
+            self._reset()
+            return
+
+        self.obj = obj
+        self.version += 1
+        self.etag = res.headers.get('ETag')
+        self.last_modified = res.headers.get('Last-Modified')
+        self._save_expiry(res.headers)
+
+    def _save_expiry(self, headers):
+        """Save the expiry time from the Cache-Control max-age directive.
+
+        Args:
+            headers (dict): response headers
+        """
+        self.expires = None
+        match = MAX_AGE_RE.search(headers.get('Cache-Control', ''))
+        if match:
+            age = int(match.group(1))
+            try:
+                # Subtract the time the response spent in a cache
+                age -= int(headers.get('Age', 0))
+            except ValueError:
+                pass
+            if age > 0:
+                self.expires = monotonic() + age
+
+    def _reset(self):
+        """ Forget the snapshot and its validators. """
+        self.obj = None
+        self.etag = None
+        self.last_modified = None
+        self.expires = None
@@ -0,0 +1,158 @@
+#! /usr/bin/env python3
+
+"""Resolve .pls playlists to stream urls.
+
+    The stream urls in a station's .pls file are cached for a while, so VLC
+    can connect to the stream directly instead of resolving the playlist on
+    every play or station switch. The streams of a playlist are
+    health-checked in parallel, and a stream that failed is moved to the end
+    of the list.
+"""
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from time import monotonic, time
+
+import requests
+
+FILE_RE = re.compile(r'^\s*File(\d+)\s*=\s*(\S+)\s*$', re.IGNORECASE | re.MULTILINE)
+
+
+def parse_pls(text):
+    """Get the stream urls from a .pls file.
+
+    Args:
+        text (str): .pls file content
+
+    Returns:
+        list: stream urls in playlist order
+    """
+    entries = sorted((int(nr), url) for nr, url in FILE_RE.findall(text))
+    urls = []
+    for _nr, url in entries:
+        if url not in urls:
+            urls.append(url)
+    return urls
+
+
+class PlsResolver():
+    """ Cache of stream urls by playlist url. """
+    def __init__(self, http, ttl=3600, check_timeout=3):
+        self.http = http
+        self.ttl = ttl
+        self.check_timeout = check_timeout
+        # Playlist url: (resolve time, list of stream urls)
+        self.cache = {}
+        self.lock = Lock()
+
+    def cached(self, url):
+        """Get the cached stream urls without touching the network.
+
+        Args:
+            url (str): playlist url
+
+        Returns:
+            list: stream urls or None when not cached or expired
+        """
+        with self.lock:
+            entry = self.cache.get(url)
+        if entry and monotonic() - entry[0] < self.ttl:
+            return list(entry[1])
+        return None
+
+    def snapshot(self):
+        """Get the cached stream urls to save them.
+
+        Returns:
+            dict: playlist url: [resolve timestamp, stream urls]
+        """
+        offset = time() - monotonic()
+        with self.lock:
+            return {url: [resolved + offset, list(urls)]
+                    for url, (resolved, urls) in self.cache.items()}
+
+    def load(self, snapshot):
+        """Restore saved stream urls, keeping their age.
+
+        Args:
+            snapshot (dict): playlist url: [resolve timestamp, stream urls]
+        """
+        offset = monotonic() - time()
+        with self.lock:
+            for url, entry in snapshot.items():
+                try:
+                    resolved, urls = entry
+                    self.cache[url] = (float(resolved) + offset, [str(stream) for stream in urls])
+                except (TypeError, ValueError):
+                    continue
+
+    def resolve(self, url, force=False, check=True):
+        """Download and parse the playlist, and health-check its streams.
+
+        Args:
+            url (str): playlist url
+            force (bool, optional): ignore the cache. Defaults to False.
+            check (bool, optional): health-check the streams. Defaults to True.
+
+        Returns:
+            list: stream urls, the playlist url itself when it cannot be resolved
+        """
+        if not force:
+            urls = self.cached(url)
+            if urls:
+                return urls
+
+        try:
+            res = self.http.get(url)
+            urls = parse_pls(res.text) if res.status_code == 200 else []
+        except requests.RequestException as err:
+            print((f"Playlist {url}: {err}"))
+            urls = []
+
+        if not urls:
+            # Keep using expired streams rather than nothing
+            with self.lock:
+                entry = self.cache.get(url)
+            return list(entry[1]) if entry else [url]
+
+        if check:
+            # Healthy streams first
+            with ThreadPoolExecutor(max_workers=min(len(urls), 4)) as executor:
+                available = list(executor.map(self.check, urls))
+            healthy = [stream for stream, ok in zip(urls, available) if ok]
+            urls = healthy + [stream for stream in urls if stream not in healthy]
+            print((f"Playlist {url}: {len(healthy)}/{len(urls)} streams available"))
+        with self.lock:
+            self.cache[url] = (monotonic(), urls)
+        return list(urls)
+
+    def check(self, stream):
+        """Check if a stream answers, reading only the response headers.
+
+        Args:
+            stream (str): stream url
+
+        Returns:
+            bool: stream is available
+        """
+        try:
+            with self.http.get(stream, retry=False, stream=True,
+                               timeout=self.check_timeout) as res:
+                return res.status_code == 200
+        except requests.RequestException:
+            return False
+
+    def failed(self, url, stream):
+        """Move a failing stream to the end of the playlist's streams.
+
+        Args:
+            url (str): playlist url
+            stream (str): stream url that failed
+        """
+        with self.lock:
+            entry = self.cache.get(url)
+            if not entry or stream not in entry[1]:
+                return
+            urls = [other for other in entry[1] if other != stream] + [stream]
+            self.cache[url] = (entry[0], urls)
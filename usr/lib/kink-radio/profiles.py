@@ -0,0 +1,54 @@
+#! /usr/bin/env python3
+
+"""Playback profiles.
+
+    A profile is a named set of VLC options in settings.ini, e.g.:
+    profile_low-latency = --network-caching=300 --clock-jitter=0
+    The options are passed to the VLC instance, and to each stream as media
+    options, so the profile also applies to options VLC only reads per media.
+"""
+
+import shlex
+
+# Prefix of the settings keys with the profile options
+PROFILE_PREFIX = 'profile_'
+# Profile that also limits background downloads
+METERED = 'metered-connection'
+
+
+def profile_names(keys):
+    """Get the profile names from the settings keys.
+
+    Args:
+        keys (list): settings keys
+
+    Returns:
+        list: sorted profile names
+    """
+    return sorted(key[len(PROFILE_PREFIX):] for key in keys
+                  if key.startswith(PROFILE_PREFIX) and len(key) > len(PROFILE_PREFIX))
+
+
+def instance_args(options):
+    """Get the VLC instance arguments of a profile.
+
+    Args:
+        options (str): VLC command line options
+
+    Returns:
+        list: VLC instance arguments
+    """
+    return ['--intf', 'dummy'] + shlex.split(options or '')
+
+
+def media_options(options):
+    """Get the VLC media options of a profile.
+
+    Args:
+        options (str): VLC command line options
+
+    Returns:
+        list: media options, e.g. ':network-caching=300'
+    """
+    return [f":{option[2:]}" for option in shlex.split(options or '')
+            if option.startswith('--')]
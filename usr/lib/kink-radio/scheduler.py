@@ -0,0 +1,176 @@
+#! /usr/bin/env python3
+
+"""Adaptive polling scheduler.
+
+    The next poll is planned around the expected end of the current track:
+    from the track's start time and duration when the feed has them, or else
+    from the observed intervals between track changes. Near the expected
+    change KINK is polled quickly, mid-track and while stopped the scheduler
+    backs off.
+"""
+
+from time import time
+from datetime import datetime
+from collections import deque
+from statistics import median
+from threading import Event
+
+# Feed keys that may hold the track's start time and duration
+START_KEYS = ('started_at', 'start_time', 'start', 'timestamp')
+DURATION_KEYS = ('duration', 'length', 'duration_ms')
+# Start polling quickly this many seconds before a change estimated from history
+EARLY_SECONDS = 10
+# Keep polling quickly this many seconds after the expected change
+BOUNDARY_SECONDS = 30
+
+
+def _to_seconds(value, milliseconds=False):
+    """Convert a duration of seconds, milliseconds or [HH:]MM:SS to seconds.
+
+    Args:
+        value (obj): duration from the feed
+        milliseconds (bool, optional): a number is in milliseconds. Defaults to False.
+
+    Returns:
+        float: duration in seconds or None
+    """
+    if isinstance(value, str) and ':' in value:
+        seconds = 0
+        try:
+            for part in value.split(':'):
+                seconds = seconds * 60 + float(part)
+        except ValueError:
+            return None
+        return seconds
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        return None
+    return seconds / 1000 if milliseconds else seconds
+
+
+def _to_timestamp(value):
+    """Convert a start time of epoch (milli)seconds or ISO 8601 to a timestamp.
+
+    Args:
+        value (obj): start time from the feed
+
+    Returns:
+        float: POSIX timestamp or None
+    """
+    try:
+        stamp = float(value)
+        # Milliseconds since the epoch
+        return stamp / 1000 if stamp > 1e11 else stamp
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def parse_timing(data):
+    """Get the start time and duration of a track.
+
+    Args:
+        data (dict): station data from the now-playing feed
+
+    Returns:
+        tuple: start timestamp and duration in seconds, or None when unknown
+    """
+    if not isinstance(data, dict):
+        return None
+    start = next((_to_timestamp(data[key]) for key in START_KEYS if key in data), None)
+    duration = next((_to_seconds(data[key], key.endswith('_ms'))
+                     for key in DURATION_KEYS if key in data), None)
+    if start and duration:
+        return start, duration
+    return None
+
+
+class PollScheduler():
+    """ Plan the next poll from track timing and change history. """
+    def __init__(self, min_wait=10, max_wait=60, idle_wait=120, adaptive=True, boundary_wait=3):
+        self.min_wait = min_wait
+        # Faster polling around the expected change
+        self.boundary_wait = min(boundary_wait, min_wait)
+        self.max_wait = max(max_wait, min_wait)
+        self.idle_wait = max(idle_wait, min_wait)
+        self.adaptive = adaptive
+        # Times of the last track changes
+        self.changes = deque(maxlen=10)
+        self.wake_event = Event()
+
+    def track_changed(self):
+        """ Remember when the track changed. """
+        self.changes.append(time())
+
+    def reset(self):
+        """ Forget the track changes, e.g. after a station switch. """
+        self.changes.clear()
+
+    def expected_change(self, timing=None):
+        """Estimate when the current track ends.
+
+        Args:
+            timing (tuple, optional): start timestamp and duration. Defaults to None.
+
+        Returns:
+            float: timestamp of the expected change or None when unknown
+        """
+        if timing:
+            start, duration = timing
+            return start + duration
+        if len(self.changes) < 3:
+            return None
+        intervals = [b - a for a, b in zip(self.changes, list(self.changes)[1:])]
+        return self.changes[-1] + median(intervals)
+
+    def next_delay(self, timing=None, playing=True, expires_in=0):
+        """Get the seconds until the next poll.
+
+        Args:
+            timing (tuple, optional): start timestamp and duration. Defaults to None.
+            playing (bool, optional): radio is playing. Defaults to True.
+            expires_in (float, optional): seconds the server says the data is fresh.
+                                          Defaults to 0.
+
+        Returns:
+            float: seconds to wait
+        """
+        if not self.adaptive:
+            delay = self.min_wait
+        elif not playing:
+            delay = self.idle_wait
+        else:
+            expected = self.expected_change(timing)
+            # A change estimated from history may come a little early
+            early = 0 if timing else EARLY_SECONDS
+            remaining = expected - time() if expected is not None else None
+            if remaining is None:
+                delay = self.min_wait
+            elif remaining > early:
+                # Sleep until shortly before the expected change
+                delay = min(max(remaining - early, self.boundary_wait), self.max_wait)
+            elif remaining > -BOUNDARY_SECONDS:
+                # Poll quickly until the change shows
+                delay = self.boundary_wait
+            else:
+                # The change is late: the estimate was off
+                delay = self.min_wait
+        # Do not poll again before the server's max-age expires
+        return max(delay, expires_in)
+
+    def wait(self, delay):
+        """Wait until the next poll or until woken.
+
+        Args:
+            delay (float): seconds to wait
+        """
+        self.wake_event.wait(delay)
+        self.wake_event.clear()
+
+    def wake(self):
+        """ Poll right away. """
+        self.wake_event.set()
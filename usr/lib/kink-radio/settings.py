@@ -0,0 +1,131 @@
+#! /usr/bin/env python3
+
+"""In-memory settings.
+
+    settings.ini is parsed once. Changes are kept in memory, observers are
+    told which keys changed and the file is written atomically (temporary
+    file and rename) after a short delay, so a burst of changes is written
+    only once.
+"""
+
+from io import StringIO
+from threading import RLock
+from configparser import ConfigParser
+from os.path import exists
+from utils import str_int, str_float, str_bool, atomic_write, restart_timer
+
+
+class Settings():
+    """ Settings parsed once with debounced atomic writes. """
+    def __init__(self, path, default_path, section='kink', delay=1.0):
+        self.path = path
+        self.section = section
+        self.delay = delay
+        self.observers = []
+        self.dirty = False
+        self.timer = None
+        self.lock = RLock()
+
+        # to keep comments, you have to trick configparser into believing that
+        # lines starting with ";" are not comments, but they are keys without a value.
+        # Set comment_prefixes to a string which you will not use in the config file
+        self.conf_parser = ConfigParser(comment_prefixes='/', allow_no_value=True)
+        if exists(self.path):
+            self.conf_parser.read(self.path)
+        if not self.conf_parser.has_section(self.section):
+            self.conf_parser.add_section(self.section)
+        self.values = dict(self.conf_parser.items(self.section))
+
+        default_parser = ConfigParser(comment_prefixes='/', allow_no_value=True)
+        default_parser.read(default_path)
+        self.defaults = dict(default_parser.items(self.section))
+
+    def subscribe(self, callback):
+        """Call callback with the set of changed keys after each change.
+
+        Args:
+            callback (obj): function with a set of keys as argument
+        """
+        self.observers.append(callback)
+
+    def keys(self):
+        """Get all settings keys, including keys only in the defaults.
+
+        Returns:
+            list: settings keys without comments
+        """
+        keys = list(self.defaults) + [key for key in self.values if key not in self.defaults]
+        return [key for key in keys if not key.startswith(';')]
+
+    def get(self, key):
+        """Get key value and add the default value when the key is missing.
+
+        Args:
+            key (str): settings key.
+
+        Returns:
+            str: value of the key
+        """
+        try:
+            return self.values[key]
+        except KeyError:
+            pass
+        with self.lock:
+            value = self.defaults[key]
+            # Add the missing key to settings.ini
+            self.values[key] = value
+            self.conf_parser.set(self.section, key, value)
+            self._schedule()
+        return value
+
+    def get_int(self, key, default=0):
+        """ Get key value as integer. """
+        return str_int(self.get(key), default)
+
+    def get_float(self, key, default=0.0):
+        """ Get key value as float. """
+        return str_float(self.get(key), default)
+
+    def get_bool(self, key):
+        """ Get key value as boolean. """
+        return str_bool(self.get(key))
+
+    def set(self, key, value):
+        """Change key value and notify observers when it changed.
+
+        Args:
+            key (str): settings key.
+            value (obj): new value, saved as string
+        """
+        # Make sure value is a string
+        value = str(value)
+        with self.lock:
+            if self.values.get(key) == value:
+                return
+            self.values[key] = value
+            self.conf_parser.set(self.section, key, value)
+            self._schedule()
+
+        for callback in self.observers:
+            callback({key})
+
+    def _schedule(self):
+        """ Write settings.ini after the delay, restarting a pending delay. """
+        self.dirty = True
+        self.timer = restart_timer(self.timer, self.delay, self.flush)
+
+    def flush(self):
+        """ Write pending changes to settings.ini. """
+        with self.lock:
+            if self.timer:
+                self.timer.cancel()
+                self.timer = None
+            if not self.dirty:
+                return
+            settings_ini = StringIO()
+            self.conf_parser.write(settings_ini)
+            try:
+                atomic_write(self.path, settings_ini.getvalue())
+                self.dirty = False
+            except OSError as err:
+                print((f"Settings: {err}"))
@@ -0,0 +1,87 @@
+#! /usr/bin/env python3
+
+"""Warm standby players.
+
+    Recently used stations keep playing muted in their own VLC player, so
+    switching back to one of them only swaps the player and unmutes it,
+    without connecting and buffering again. The number of players and the
+    time they stay warm are limited to cap memory and bandwidth use.
+"""
+
+from time import monotonic
+from collections import OrderedDict
+
+
+class StandbyPool():
+    """ Muted, connected players by station. """
+    def __init__(self, size=0, keep_minutes=15):
+        self.size = size
+        self.keep = keep_minutes * 60
+        # Station: (vlc.MediaListPlayer, time added)
+        self.players = OrderedDict()
+
+    @property
+    def enabled(self):
+        """ Standby players are allowed. """
+        return self.size > 0
+
+    def add(self, station, list_player):
+        """Keep a playing player muted on standby.
+
+        Args:
+            station (str): KINK station
+            list_player (vlc.MediaListPlayer): playing player
+        """
+        if not self.enabled or not list_player.is_playing():
+            self._release(list_player)
+            return
+        list_player.get_media_player().audio_set_mute(True)
+        old = self.players.pop(station, None)
+        if old:
+            self._release(old[0])
+        self.players[station] = (list_player, monotonic())
+
+        # Drop the least recently used players
+        while len(self.players) > self.size:
+            self._release(self.players.popitem(last=False)[1][0])
+
+    def take(self, station):
+        """Get the standby player of a station.
+
+        Args:
+            station (str): KINK station
+
+        Returns:
+            vlc.MediaListPlayer: unmuted player or None when not on standby
+        """
+        entry = self.players.pop(station, None)
+        if not entry:
+            return None
+        list_player = entry[0]
+        if not list_player.is_playing():
+            self._release(list_player)
+            return None
+        list_player.get_media_player().audio_set_mute(False)
+        return list_player
+
+    def expire(self):
+        """ Release players that were on standby for too long. """
+        now = monotonic()
+        for station, (list_player, added) in list(self.players.items()):
+            if now - added > self.keep or not list_player.is_playing():
+                del self.players[station]
+                self._release(list_player)
+
+    def clear(self):
+        """ Release all standby players. """
+        while self.players:
+            self._release(self.players.popitem()[1][0])
+
+    def _release(self, list_player):
+        """Stop a player and free its resources.
+
+        Args:
+            list_player (vlc.MediaListPlayer): player to release
+        """
+        list_player.stop()
+        list_player.release()
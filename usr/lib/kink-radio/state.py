@@ -0,0 +1,163 @@
+#! /usr/bin/env python3
+
+"""Last known state.
+
+    The station list, the last track of each station and the resolved
+    stream urls are kept in a small JSON file, so the menu and "Now playing"
+    work right after startup, before the first poll and while offline.
+    Changes are written atomically (temporary file and rename) after a
+    short delay.
+"""
+
+import json
+from threading import RLock
+from os.path import exists
+from feed import Track
+from utils import atomic_write, restart_timer
+
+# Increase when the layout of the file changes
+VERSION = 1
+
+
+class State():
+    """ Snapshot of stations, tracks and streams with debounced atomic writes. """
+    def __init__(self, path, delay=2.0):
+        self.path = path
+        self.delay = delay
+        self.dirty = False
+        self.timer = None
+        self.lock = RLock()
+        self.data = {'version': VERSION, 'stations': [], 'tracks': {}, 'streams': {}}
+        self.load()
+
+    def load(self):
+        """ Read the state file, ignoring a missing, damaged or outdated file. """
+        try:
+            with open(self.path, encoding='utf-8') as state_file:
+                data = json.load(state_file)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get('version') != VERSION:
+            return
+        for key, value in data.items():
+            if key in self.data and isinstance(value, type(self.data[key])):
+                self.data[key] = value
+
+    def stations(self):
+        """Get the last known station list.
+
+        Returns:
+            list: station names
+        """
+        return [str(station) for station in self.data['stations']]
+
+    def track(self, station):
+        """Get the last known track of a station.
+
+        Args:
+            station (str): KINK station
+
+        Returns:
+            Track: last track, empty when unknown
+        """
+        data = self.data['tracks'].get(station)
+        if not isinstance(data, dict):
+            return Track(station=station)
+        return Track(station=station,
+                     program=str(data.get('program', '')),
+                     artist=str(data.get('artist', '')),
+                     title=str(data.get('title', '')),
+                     album_art=str(data.get('album_art', '')))
+
+    def tracks(self):
+        """Get the last known tracks of all stations.
+
+        Returns:
+            dict: Track by station
+        """
+        return {station: self.track(station) for station in self.data['tracks']}
+
+    def thumb(self, station):
+        """Get the cached album art of a station's last track.
+
+        Args:
+            station (str): KINK station
+
+        Returns:
+            str: image path or empty string when not on disk
+        """
+        data = self.data['tracks'].get(station)
+        thumb = data.get('thumb', '') if isinstance(data, dict) else ''
+        return thumb if thumb and exists(thumb) else ''
+
+    def streams(self):
+        """Get the resolved stream urls.
+
+        Returns:
+            dict: playlist url: [resolve timestamp, stream urls]
+        """
+        return self.data['streams']
+
+    def set_stations(self, stations):
+        """Save the station list.
+
+        Args:
+            stations (list): station names
+        """
+        self._set('stations', list(stations))
+
+    def set_track(self, track, thumb=''):
+        """Save the last track of a station.
+
+        Args:
+            track (Track): track to save
+            thumb (str, optional): path of the cached album art. Defaults to ''.
+        """
+        if not track.station:
+            return
+        data = {'program': track.program,
+                'artist': track.artist,
+                'title': track.title,
+                'album_art': track.album_art}
+        if thumb:
+            data['thumb'] = thumb
+        with self.lock:
+            tracks = dict(self.data['tracks'])
+            tracks[track.station] = data
+            self._set('tracks', tracks)
+
+    def set_streams(self, streams):
+        """Save the resolved stream urls.
+
+        Args:
+            streams (dict): playlist url: [resolve timestamp, stream urls]
+        """
+        self._set('streams', streams)
+
+    def _set(self, key, value):
+        """Change a value and schedule a write when it changed.
+
+        Args:
+            key (str): state key
+            value (obj): new value
+        """
+        with self.lock:
+            if self.data[key] == value:
+                return
+            self.data[key] = value
+            self.dirty = True
+            self.timer = restart_timer(self.timer, self.delay, self.flush)
+
+    def flush(self):
+        """ Write pending changes to the state file. """
+        with self.lock:
+            if self.timer:
+                self.timer.cancel()
+                self.timer = None
+            if not self.dirty:
+                return
+            try:
+                atomic_write(self.path, json.dumps(self.data, separators=(',', ':')))
+                self.dirty = False
+            except OSError as err:
+                print((f"State: {err}"))
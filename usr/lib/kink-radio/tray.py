@@ -0,0 +1,71 @@
+#! /usr/bin/env python3
+
+"""System tray front end.
+
+    The indicator icon with its menu, and the desktop notifications. Only
+    this module and the menu load GTK, so the headless daemon runs without
+    them.
+"""
+
+from menu import TrayMenu
+from notifier import Notifier
+
+import gi
+gi.require_version('Notify', '0.7')
+from gi.repository import Notify
+gi.require_version('AyatanaAppIndicator3', '0.1')
+from gi.repository import AyatanaAppIndicator3 as AppIndicator3
+
+
+class Tray():
+    """ Indicator icon, menu and notifications. """
+    def __init__(self, kink, app_id, title, notify_interval=2.0):
+        # Create global indicator object
+        self.indicator = AppIndicator3.Indicator.new(app_id,
+                                                     app_id,
+                                                     AppIndicator3.IndicatorCategory.OTHER)
+        self.indicator.set_title(title)
+        self.indicator.set_status(AppIndicator3.IndicatorStatus.ACTIVE)
+        self.menu = TrayMenu(kink=kink, title=title)
+        self.indicator.set_menu(self.menu.menu)
+
+        # Init notifier
+        Notify.init(title)
+        self.notifier = Notifier(min_interval=notify_interval)
+
+    def set_icon(self, icon):
+        """Change the indicator icon.
+
+        Args:
+            icon (str): icon name or path
+        """
+        self.indicator.set_icon_full(icon, '')
+
+    def update(self):
+        """ Update the menu items in place. """
+        self.menu.update()
+
+    def notify(self, summary, body=None, thumb=None, timeout=10, key='notification'):
+        """Show or update the notification of a category.
+
+        Args:
+            summary (str): notification summary.
+            body (str, optional): notification body text. Defaults to None.
+            thumb (str, optional): icon path. Defaults to None.
+            timeout (int, optional): seconds to show the notification. Defaults to 10.
+            key (str, optional): notification category. Defaults to 'notification'.
+        """
+        self.notifier.show(key, summary, body, thumb, timeout)
+
+    def close_notification(self, key):
+        """Remove the notification of a category.
+
+        Args:
+            key (str): notification category
+        """
+        self.notifier.close(key)
+
+    def close(self):
+        """ Remove the notifications and release the notification service. """
+        self.notifier.close_all()
+        Notify.uninit()
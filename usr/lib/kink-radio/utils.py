@@ -2,8 +2,13 @@
 
 """Common utilities"""
 
+import os
+import stat
 import subprocess
 import shlex
+from tempfile import mkstemp
+from threading import Timer
+from os.path import dirname, exists
 import gi
 gi.require_version('Gtk', '3.0')
 from gi.repository import Gio
@@ -46,8 +51,60 @@ def str_int(nr_str, default_int=0):
     except ValueError:
         return default_int
 
+def str_float(nr_str, default_float=0.0):
+    """ Convert string to float or return default value. """
+    try:
+        return float(nr_str)
+    except ValueError:
+        return default_float
+
 def str_bool(bool_str):
     """ Convert string to boolean """
     if bool_str.strip().lower() in ['true', '1', 'yes', 'y']:
         return True
     return False
+
+def atomic_write(path, data, suffix='.tmp'):
+    """Write a file through a temporary file and a rename.
+
+    Readers never see a half written file, also when writing fails. An
+    existing file keeps its permissions.
+
+    Args:
+        path (str): file path
+        data (str or bytes): file content, text is written as UTF-8
+        suffix (str, optional): suffix of the temporary file. Defaults to '.tmp'.
+
+    Raises:
+        OSError: the file could not be written
+    """
+    fd, tmp = mkstemp(dir=dirname(path), suffix=suffix)
+    try:
+        with os.fdopen(fd, mode='wb') as file:
+            file.write(data.encode('utf-8') if isinstance(data, str) else data)
+        # mkstemp creates the file readable for the owner only
+        if exists(path):
+            os.chmod(tmp, stat.S_IMODE(os.stat(path).st_mode))
+        os.replace(tmp, path)
+    except OSError:
+        if exists(tmp):
+            os.remove(tmp)
+        raise
+
+def restart_timer(timer, delay, function):
+    """Cancel a pending timer and start a new one, to write a burst of changes once.
+
+    Args:
+        timer (threading.Timer): pending timer or None
+        delay (float): seconds to wait
+        function (obj): function to call after the delay
+
+    Returns:
+        threading.Timer: the started timer
+    """
+    if timer:
+        timer.cancel()
+    timer = Timer(delay, function)
+    timer.daemon = True
+    timer.start()
+    return timer
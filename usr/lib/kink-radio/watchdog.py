@@ -0,0 +1,164 @@
+#! /usr/bin/env python3
+
+"""Playback health watchdog.
+
+    VLC events (EndReached, EncounteredError, Buffering) and periodic state
+    checks detect a stream that stopped, failed or stalled while the radio
+    should be playing. The stream is then reconnected with exponential
+    backoff. Underruns, stalls, reconnects and the time to first audio are
+    counted for the metrics.
+"""
+
+from time import monotonic
+
+import vlc
+
+# States in which a stream that should be playing needs a reconnect
+DEAD_STATES = (vlc.State.Ended, vlc.State.Error, vlc.State.Stopped, vlc.State.NothingSpecial)
+# Playing this long without problems resets the backoff
+HEALTHY_SECONDS = 60
+# Time to connect, or to fail over to the next stream, before checking
+GRACE_SECONDS = 10
+
+
+class PlaybackWatchdog():
+    """ Reconnect the stream when playback stops unexpectedly. """
+    def __init__(self, reconnect, max_backoff=60):
+        self.reconnect = reconnect
+        self.max_backoff = max_backoff
+        self.list_player = None
+        # Radio should be playing
+        self.wanted = False
+        self.failures = 0
+        self.next_try = 0
+        self.grace_until = 0
+        self.play_started = None
+        self.playing_since = None
+        self.buffering = False
+        self.last_time = None
+        # Metrics
+        self.underruns = 0
+        self.stalls = 0
+        self.reconnects = 0
+        self.errors = 0
+        self.first_audio = None
+
+    def attach(self, list_player):
+        """Listen to the events of a player.
+
+        Args:
+            list_player (vlc.MediaListPlayer): player to listen to
+        """
+        events = list_player.get_media_player().event_manager()
+        # Events arrive in a VLC thread: only save state here
+        events.event_attach(vlc.EventType.MediaPlayerBuffering,
+                            lambda event: self._buffering(list_player, event.u.new_cache))
+        events.event_attach(vlc.EventType.MediaPlayerEncounteredError,
+                            lambda event: self._error(list_player))
+        events.event_attach(vlc.EventType.MediaPlayerEndReached,
+                            lambda event: self._ended(list_player))
+
+    def watch(self, list_player):
+        """Watch the active player, e.g. after swapping players.
+
+        Args:
+            list_player (vlc.MediaListPlayer): active player
+        """
+        self.list_player = list_player
+        self.last_time = None
+
+    def started(self):
+        """ Playback was started by the user. """
+        self.wanted = True
+        self.play_started = monotonic()
+        self.grace_until = self.play_started + GRACE_SECONDS
+        self.playing_since = None
+        self.last_time = None
+
+    def stopped(self):
+        """ Playback was stopped by the user. """
+        self.wanted = False
+        self.play_started = None
+        self.playing_since = None
+
+    def _buffering(self, list_player, cache):
+        """Handle buffering progress.
+
+        Args:
+            list_player (vlc.MediaListPlayer): player of the event
+            cache (float): buffer fill percentage
+        """
+        if list_player is not self.list_player:
+            return
+        if cache < 100:
+            # Buffering again after audio started: an underrun
+            if self.playing_since is not None and not self.buffering:
+                self.underruns += 1
+            self.buffering = True
+            return
+        self.buffering = False
+        if self.playing_since is None and self.play_started is not None:
+            self.playing_since = monotonic()
+            self.first_audio = self.playing_since - self.play_started
+            print((f"Time to first audio: {self.first_audio:.2f}s"))
+
+    def _error(self, list_player):
+        """ Count stream errors of the active player. """
+        if list_player is self.list_player:
+            self.errors += 1
+            self.grace_until = monotonic() + GRACE_SECONDS
+
+    def _ended(self, list_player):
+        """ A live stream should never end: let the next check handle it. """
+        if list_player is self.list_player:
+            self.grace_until = 0
+
+    def check(self):
+        """Check the player state and reconnect when needed.
+
+        Returns:
+            bool: True to keep the periodic check running
+        """
+        if not self.wanted or not self.list_player:
+            return True
+        now = monotonic()
+        if now < self.grace_until:
+            return True
+        media_player = self.list_player.get_media_player()
+        state = media_player.get_state()
+
+        stalled = False
+        if state == vlc.State.Playing and not self.buffering:
+            # A live stream's time must move on
+            cur_time = media_player.get_time()
+            stalled = cur_time == self.last_time and cur_time > 0
+            self.last_time = cur_time
+            if stalled:
+                self.stalls += 1
+            elif self.playing_since and now - self.playing_since > HEALTHY_SECONDS:
+                self.failures = 0
+
+        if (state in DEAD_STATES or stalled) and now >= self.next_try:
+            self.failures += 1
+            self.reconnects += 1
+            backoff = min(2 ** (self.failures - 1), self.max_backoff)
+            self.next_try = now + backoff
+            print((f"Reconnecting stream ({state}), next try in {backoff}s"))
+            self.play_started = now
+            self.playing_since = None
+            self.last_time = None
+            self.grace_until = now + GRACE_SECONDS
+            self.reconnect()
+        return True
+
+    def stats(self):
+        """Get the playback metrics.
+
+        Returns:
+            dict: metric name and value
+        """
+        return {'underruns': self.underruns,
+                'stalls': self.stalls,
+                'reconnects': self.reconnects,
+                'errors': self.errors,
+                'time_to_first_audio': self.first_audio}
@@ -0,0 +1,68 @@
+#! /usr/bin/env python3
+
+"""Run blocking jobs off the GTK main loop.
+
+    Jobs run in a small thread pool. Results are handed back to a callback
+    on the GLib main loop with GLib.idle_add, so callbacks may safely use Gtk.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import gi
+gi.require_version('GLib', '2.0')
+from gi.repository import GLib
+
+
+class Worker():
+    """ Thread pool that delivers job results on the GLib main loop. """
+    def __init__(self, max_workers=2):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix='kink-worker')
+
+    def submit(self, function, *args, callback=None, error_callback=None):
+        """Run function in the thread pool.
+
+        Args:
+            function (obj): blocking function to run
+            args: function arguments
+            callback (obj, optional): called on the main loop with the result. Defaults to None.
+            error_callback (obj, optional): called on the main loop with the exception
+                                            when the job failed. Defaults to None.
+
+        Returns:
+            concurrent.futures.Future: future of the job
+        """
+        future = self.executor.submit(function, *args)
+        if callback or error_callback:
+            future.add_done_callback(lambda f: GLib.idle_add(self._deliver, f,
+                                                             callback, error_callback))
+        return future
+
+    def _deliver(self, future, callback, error_callback=None):
+        """Pass the job result to the callback on the main loop.
+
+        Args:
+            future (concurrent.futures.Future): finished job
+            callback (obj): function to call with the result
+            error_callback (obj, optional): function to call with the exception.
+                                            Defaults to None.
+
+        Returns:
+            bool: False to remove the idle source
+        """
+        if future.cancelled():
+            return False
+        err = future.exception()
+        if err:
+            if error_callback:
+                error_callback(err)
+            else:
+                print((f"Worker: {err}"))
+            return False
+        if callback:
+            callback(future.result())
+        return False
+
+    def shutdown(self):
+        """ Cancel pending jobs and stop the pool. """
+        self.executor.shutdown(wait=False, cancel_futures=True)